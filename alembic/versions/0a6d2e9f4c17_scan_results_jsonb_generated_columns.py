@@ -0,0 +1,76 @@
+"""scan_results_jsonb_generated_columns
+
+Revision ID: 0a6d2e9f4c17
+Revises: f7b0c3d18e25
+Create Date: 2026-10-19 14:21:36.830127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6d2e9f4c17'
+down_revision: Union[str, Sequence[str], None] = 'f7b0c3d18e25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check existing state (for existing databases)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    columns = {col['name']: col for col in inspector.get_columns('scan_results')}
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('scan_results')]
+
+    if not isinstance(columns['result_json']['type'], JSONB):
+        op.execute("ALTER TABLE scan_results ALTER COLUMN result_json TYPE JSONB USING result_json::jsonb")
+
+    if 'disease_name' not in columns:
+        # Generated columns are added in one statement so the table is rewritten once
+        op.execute("""
+            ALTER TABLE scan_results
+            ADD COLUMN disease_name VARCHAR(200)
+                GENERATED ALWAYS AS (substr(initcap(btrim(result_json ->> 'disease_name')), 1, 200)) STORED,
+            ADD COLUMN consensus_confidence DOUBLE PRECISION
+                GENERATED ALWAYS AS (
+                    CASE WHEN jsonb_typeof(result_json -> 'consensus_confidence') = 'number'
+                    THEN (result_json ->> 'consensus_confidence')::double precision END
+                ) STORED,
+            ADD COLUMN needs_review BOOLEAN
+                GENERATED ALWAYS AS (
+                    CASE WHEN jsonb_typeof(result_json -> 'needs_review') = 'boolean'
+                    THEN (result_json ->> 'needs_review')::boolean END
+                ) STORED
+        """)
+
+    # Build indexes without blocking scan writes
+    with op.get_context().autocommit_block():
+        if 'ix_scan_results_scan_id' not in existing_indexes:
+            op.create_index('ix_scan_results_scan_id', 'scan_results', ['scan_id'], unique=False, postgresql_concurrently=True)
+        if 'ix_scan_results_disease_name' not in existing_indexes:
+            op.create_index('ix_scan_results_disease_name', 'scan_results', ['disease_name'], unique=False, postgresql_concurrently=True)
+        if 'ix_scan_results_consensus_confidence' not in existing_indexes:
+            op.create_index('ix_scan_results_consensus_confidence', 'scan_results', ['consensus_confidence'], unique=False, postgresql_concurrently=True)
+        if 'ix_scan_results_needs_review' not in existing_indexes:
+            op.create_index('ix_scan_results_needs_review', 'scan_results', ['created_at'], unique=False, postgresql_where=sa.text('needs_review'), postgresql_concurrently=True)
+        if 'ix_scan_results_result_json' not in existing_indexes:
+            op.create_index('ix_scan_results_result_json', 'scan_results', ['result_json'], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scan_results_result_json', table_name='scan_results')
+    op.drop_index('ix_scan_results_needs_review', table_name='scan_results')
+    op.drop_index('ix_scan_results_consensus_confidence', table_name='scan_results')
+    op.drop_index('ix_scan_results_disease_name', table_name='scan_results')
+    op.drop_index('ix_scan_results_scan_id', table_name='scan_results')
+    op.drop_column('scan_results', 'needs_review')
+    op.drop_column('scan_results', 'consensus_confidence')
+    op.drop_column('scan_results', 'disease_name')
+    op.execute("ALTER TABLE scan_results ALTER COLUMN result_json TYPE JSON USING result_json::json")
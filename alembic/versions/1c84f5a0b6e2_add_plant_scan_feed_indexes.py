@@ -0,0 +1,39 @@
+"""add_plant_scan_feed_indexes
+
+Revision ID: 1c84f5a0b6e2
+Revises: 0a6d2e9f4c17
+Create Date: 2026-10-19 15:08:44.219573
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c84f5a0b6e2'
+down_revision: Union[str, Sequence[str], None] = '0a6d2e9f4c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('plant_scans')]
+
+    # Build without blocking scan writes
+    with op.get_context().autocommit_block():
+        if 'ix_plant_scans_created_at_id' not in existing_indexes:
+            op.create_index('ix_plant_scans_created_at_id', 'plant_scans', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        if 'ix_plant_scans_user_id_created_at' not in existing_indexes:
+            op.create_index('ix_plant_scans_user_id_created_at', 'plant_scans', ['user_id', 'created_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_plant_scans_user_id_created_at', table_name='plant_scans')
+    op.drop_index('ix_plant_scans_created_at_id', table_name='plant_scans')
@@ -0,0 +1,41 @@
+"""add_sku_to_products
+
+Revision ID: 2e9a7b41d3c8
+Revises: 1c84f5a0b6e2
+Create Date: 2026-10-19 16:15:02.663419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e9a7b41d3c8'
+down_revision: Union[str, Sequence[str], None] = '1c84f5a0b6e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check if column already exists (for existing databases)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_columns = [col['name'] for col in inspector.get_columns('products')]
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('products')]
+
+    if 'sku' not in existing_columns:
+        op.add_column('products', sa.Column('sku', sa.String(length=100), nullable=True))
+
+    with op.get_context().autocommit_block():
+        if 'ix_products_sku' not in existing_indexes:
+            op.create_index('ix_products_sku', 'products', ['sku'], unique=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_sku', table_name='products')
+    op.drop_column('products', 'sku')
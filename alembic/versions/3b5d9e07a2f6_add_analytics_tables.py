@@ -0,0 +1,70 @@
+"""add_analytics_tables
+
+Revision ID: 3b5d9e07a2f6
+Revises: 2e9a7b41d3c8
+Create Date: 2026-10-19 16:41:27.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b5d9e07a2f6'
+down_revision: Union[str, Sequence[str], None] = '2e9a7b41d3c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check if tables already exist (for existing databases)
+    # The analytics aggregator fills these from the oldest raw row on first run
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_tables = inspector.get_table_names()
+
+    if 'analytics_disease_regions' not in existing_tables:
+        op.create_table('analytics_disease_regions',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('region', sa.String(length=50), nullable=False),
+        sa.Column('disease_name', sa.String(length=200), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'region', 'disease_name')
+        )
+
+    if 'analytics_product_funnel' not in existing_tables:
+        op.create_table('analytics_product_funnel',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('product_id', sa.UUID(), nullable=False),
+        sa.Column('recommendations', sa.Integer(), nullable=False),
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+        sa.PrimaryKeyConstraint('day', 'product_id')
+        )
+
+    if 'analytics_monthly_active_users' not in existing_tables:
+        op.create_table('analytics_monthly_active_users',
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.PrimaryKeyConstraint('month', 'user_id')
+        )
+
+    if 'analytics_watermarks' not in existing_tables:
+        op.create_table('analytics_watermarks',
+        sa.Column('source', sa.String(length=50), nullable=False),
+        sa.Column('processed_until', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('source')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('analytics_watermarks')
+    op.drop_table('analytics_monthly_active_users')
+    op.drop_table('analytics_product_funnel')
+    op.drop_table('analytics_disease_regions')
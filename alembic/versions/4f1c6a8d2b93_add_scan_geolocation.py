@@ -0,0 +1,78 @@
+"""add_scan_geolocation
+
+Revision ID: 4f1c6a8d2b93
+Revises: 3b5d9e07a2f6
+Create Date: 2026-10-19 17:22:05.604117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f1c6a8d2b93'
+down_revision: Union[str, Sequence[str], None] = '3b5d9e07a2f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check if columns/tables already exist (for existing databases)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_tables = inspector.get_table_names()
+    existing_columns = [col['name'] for col in inspector.get_columns('plant_scans')]
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('plant_scans')]
+
+    if 'latitude' not in existing_columns:
+        op.add_column('plant_scans', sa.Column('latitude', sa.Float(), nullable=True))
+    if 'longitude' not in existing_columns:
+        op.add_column('plant_scans', sa.Column('longitude', sa.Float(), nullable=True))
+    if 'geohash' not in existing_columns:
+        op.add_column('plant_scans', sa.Column('geohash', sa.String(length=12), nullable=True))
+
+    if 'geo_disease_counts' not in existing_tables:
+        op.create_table('geo_disease_counts',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('cell', sa.String(length=12), nullable=False),
+        sa.Column('disease_name', sa.String(length=200), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'cell', 'disease_name')
+        )
+
+    if 'geo_outbreaks' not in existing_tables:
+        op.create_table('geo_outbreaks',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('cell', sa.String(length=12), nullable=False),
+        sa.Column('disease_name', sa.String(length=200), nullable=False),
+        sa.Column('recent_count', sa.Integer(), nullable=False),
+        sa.Column('baseline_count', sa.Integer(), nullable=False),
+        sa.Column('detected_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('day', 'cell', 'disease_name')
+        )
+        op.create_index('ix_geo_outbreaks_cell', 'geo_outbreaks', ['cell', 'day'], unique=False)
+
+    # Build without blocking scan writes
+    with op.get_context().autocommit_block():
+        if 'ix_plant_scans_geohash' not in existing_indexes:
+            op.create_index(
+                'ix_plant_scans_geohash', 'plant_scans', ['geohash'], unique=False,
+                postgresql_ops={'geohash': 'varchar_pattern_ops'},
+                postgresql_where=sa.text('geohash IS NOT NULL'),
+                postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_plant_scans_geohash', table_name='plant_scans')
+    op.drop_index('ix_geo_outbreaks_cell', table_name='geo_outbreaks')
+    op.drop_table('geo_outbreaks')
+    op.drop_table('geo_disease_counts')
+    op.drop_column('plant_scans', 'geohash')
+    op.drop_column('plant_scans', 'longitude')
+    op.drop_column('plant_scans', 'latitude')
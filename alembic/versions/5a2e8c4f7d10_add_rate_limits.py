@@ -0,0 +1,43 @@
+"""add_rate_limits
+
+Revision ID: 5a2e8c4f7d10
+Revises: 4f1c6a8d2b93
+Create Date: 2026-10-19 18:05:39.882410
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a2e8c4f7d10'
+down_revision: Union[str, Sequence[str], None] = '4f1c6a8d2b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check if table already exists (for existing databases)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_tables = inspector.get_table_names()
+
+    # UNLOGGED: no WAL for this hot, disposable state
+    if 'rate_limits' not in existing_tables:
+        op.create_table('rate_limits',
+        sa.Column('key', sa.String(length=200), nullable=False),
+        sa.Column('tat', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        prefixes=['UNLOGGED']
+        )
+        op.create_index('ix_rate_limits_tat', 'rate_limits', ['tat'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rate_limits_tat', table_name='rate_limits')
+    op.drop_table('rate_limits')
@@ -0,0 +1,72 @@
+"""hash_user_session_tokens
+
+Revision ID: 6c3f9a1e5b27
+Revises: 5a2e8c4f7d10
+Create Date: 2026-10-19 18:47:12.093551
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c3f9a1e5b27'
+down_revision: Union[str, Sequence[str], None] = '5a2e8c4f7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check if table/columns already exist (for existing databases)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_tables = inspector.get_table_names()
+
+    if 'user_sessions' not in existing_tables:
+        op.create_table('user_sessions',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=True),
+        sa.Column('token_hash', sa.LargeBinary(length=32), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token_hash')
+        )
+    else:
+        existing_columns = [col['name'] for col in inspector.get_columns('user_sessions')]
+        if 'created_at' not in existing_columns:
+            op.add_column('user_sessions', sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True))
+        if 'token_hash' not in existing_columns:
+            # Expired sessions are useless; drop them instead of hashing them
+            op.execute("DELETE FROM user_sessions WHERE expires_at < now()")
+            op.add_column('user_sessions', sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True))
+            # Existing tokens stay valid: SHA-256 of the token text, as hash_token() computes
+            op.execute("UPDATE user_sessions SET token_hash = sha256(convert_to(token, 'UTF8'))")
+            op.alter_column('user_sessions', 'token_hash', nullable=False)
+            op.create_unique_constraint('user_sessions_token_hash_key', 'user_sessions', ['token_hash'])
+        if 'token' in existing_columns:
+            op.drop_column('user_sessions', 'token')
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('user_sessions')] if 'user_sessions' in existing_tables else []
+    if 'ix_user_sessions_user_id_created_at' not in existing_indexes:
+        op.create_index('ix_user_sessions_user_id_created_at', 'user_sessions', ['user_id', 'created_at'], unique=False)
+    if 'ix_user_sessions_expires_at' not in existing_indexes:
+        op.create_index('ix_user_sessions_expires_at', 'user_sessions', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Raw tokens can't be recovered from their hashes; sessions are dropped
+    op.execute("DELETE FROM user_sessions")
+    op.drop_index('ix_user_sessions_expires_at', table_name='user_sessions')
+    op.drop_index('ix_user_sessions_user_id_created_at', table_name='user_sessions')
+    op.drop_constraint('user_sessions_token_hash_key', 'user_sessions', type_='unique')
+    op.drop_column('user_sessions', 'token_hash')
+    op.add_column('user_sessions', sa.Column('token', sa.String(), nullable=True))
+    op.create_unique_constraint('user_sessions_token_key', 'user_sessions', ['token'])
+    op.drop_column('user_sessions', 'created_at')
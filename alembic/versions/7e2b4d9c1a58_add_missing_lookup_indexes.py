@@ -0,0 +1,53 @@
+"""add_missing_lookup_indexes
+
+Revision ID: 7e2b4d9c1a58
+Revises: 6c3f9a1e5b27
+Create Date: 2026-10-19 16:12:40.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2b4d9c1a58'
+down_revision: Union[str, Sequence[str], None] = '6c3f9a1e5b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Already covered, so not created here:
+#   cart_items(cart_id)        - (cart_id, product_id) primary key
+#   order_items(order_id)      - (order_id, product_id) primary key
+#   orders(user_id, created_at) - ix_orders_user_id_created_at
+#   scan_results(scan_id)      - ix_scan_results_scan_id
+#   plant_scans(created_at)    - ix_plant_scans_created_at_id
+INDEXES = [
+    ('ix_carts_user_id_is_active', 'carts', ['user_id', 'is_active']),
+    ('ix_product_images_product_id', 'product_images', ['product_id']),
+    ('ix_user_roles_user_id_role', 'user_roles', ['user_id', 'role']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_indexes = {
+        table: [idx['name'] for idx in inspector.get_indexes(table)]
+        for table in {table for _, table, _ in INDEXES}
+    }
+
+    # Build without blocking writes to the tables
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if name not in existing_indexes[table]:
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,47 @@
+"""add_user_id_to_outbox_messages
+
+Revision ID: 8d4a1f6e3c92
+Revises: 7e2b4d9c1a58
+Create Date: 2026-10-19 17:05:12.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4a1f6e3c92'
+down_revision: Union[str, Sequence[str], None] = '7e2b4d9c1a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    existing_columns = [col['name'] for col in inspector.get_columns('outbox_messages')]
+    if 'user_id' not in existing_columns:
+        op.add_column('outbox_messages', sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True))
+        # Outbox rows are purged after OUTBOX_RETENTION_HOURS, so this touches few rows
+        op.execute("""
+            UPDATE outbox_messages SET user_id = (payload ->> 'user_id')::uuid
+            WHERE topic = 'order.status_changed' AND payload ->> 'user_id' IS NOT NULL
+        """)
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('outbox_messages')]
+    # Build without blocking the outbox writers
+    with op.get_context().autocommit_block():
+        if 'ix_outbox_messages_user_id_id' not in existing_indexes:
+            op.create_index('ix_outbox_messages_user_id_id', 'outbox_messages', ['user_id', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_messages_user_id_id', table_name='outbox_messages')
+    op.drop_column('outbox_messages', 'user_id')
@@ -0,0 +1,36 @@
+"""add_scan_results_created_at_index
+
+Revision ID: 9f2c6b8e4d13
+Revises: 8d4a1f6e3c92
+Create Date: 2026-10-19 18:20:37.915402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f2c6b8e4d13'
+down_revision: Union[str, Sequence[str], None] = '8d4a1f6e3c92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('scan_results')]
+
+    # The analytics aggregator windows scan_results on created_at; build without blocking scan inserts
+    with op.get_context().autocommit_block():
+        if 'ix_scan_results_created_at' not in existing_indexes:
+            op.create_index('ix_scan_results_created_at', 'scan_results', ['created_at'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scan_results_created_at', table_name='scan_results')
@@ -0,0 +1,71 @@
+"""shard_daily_rollups
+
+Revision ID: a4e7d2c9b615
+Revises: 9f2c6b8e4d13
+Create Date: 2026-10-19 19:02:11.482907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e7d2c9b615'
+down_revision: Union[str, Sequence[str], None] = '9f2c6b8e4d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> primary key columns after the shard column is added
+TABLES = {
+    'daily_stats': ['day', 'shard'],
+    'daily_disease_counts': ['day', 'disease_name', 'shard'],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One row per day (and disease) until now; existing rows become shard 0.
+    # Both tables hold a few rows per day, so rebuilding the key is quick.
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    for table, columns in TABLES.items():
+        existing_columns = [col['name'] for col in inspector.get_columns(table)]
+        if 'shard' not in existing_columns:
+            op.add_column(table, sa.Column('shard', sa.SmallInteger(), server_default='0', nullable=False))
+        primary_key = inspector.get_pk_constraint(table)
+        if primary_key['constrained_columns'] != columns:
+            op.drop_constraint(primary_key['name'], table, type_='primary')
+            op.create_primary_key(f'{table}_pkey', table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fold the shards back into one row per key before restoring the old key
+    op.execute("""
+        CREATE TEMP TABLE daily_stats_merged ON COMMIT DROP AS
+        SELECT day, sum(scans) AS scans, sum(orders) AS orders, sum(revenue) AS revenue
+        FROM daily_stats GROUP BY day
+    """)
+    op.execute("DELETE FROM daily_stats")
+    op.execute("""
+        INSERT INTO daily_stats (day, shard, scans, orders, revenue)
+        SELECT day, 0, scans, orders, revenue FROM daily_stats_merged
+    """)
+    op.execute("""
+        CREATE TEMP TABLE daily_disease_counts_merged ON COMMIT DROP AS
+        SELECT day, disease_name, sum(count) AS count
+        FROM daily_disease_counts GROUP BY day, disease_name
+    """)
+    op.execute("DELETE FROM daily_disease_counts")
+    op.execute("""
+        INSERT INTO daily_disease_counts (day, disease_name, shard, count)
+        SELECT day, disease_name, 0, count FROM daily_disease_counts_merged
+    """)
+    for table, columns in TABLES.items():
+        op.drop_constraint(f'{table}_pkey', table, type_='primary')
+        op.create_primary_key(f'{table}_pkey', table, [column for column in columns if column != 'shard'])
+        op.drop_column(table, 'shard')
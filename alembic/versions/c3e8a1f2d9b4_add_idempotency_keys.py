@@ -0,0 +1,44 @@
+"""add_idempotency_keys
+
+Revision ID: c3e8a1f2d9b4
+Revises: 56b0ea76de45
+Create Date: 2026-10-19 09:12:40.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a1f2d9b4'
+down_revision: Union[str, Sequence[str], None] = '56b0ea76de45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check if table already exists (for existing databases)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'idempotency_keys' not in inspector.get_table_names():
+        op.create_table('idempotency_keys',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('scope', sa.String(length=100), nullable=False),
+        sa.Column('response_json', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'key')
+        )
+        op.create_index(op.f('ix_idempotency_keys_expires_at'), 'idempotency_keys', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_idempotency_keys_expires_at'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
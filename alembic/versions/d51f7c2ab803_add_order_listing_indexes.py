@@ -0,0 +1,40 @@
+"""add_order_listing_indexes
+
+Revision ID: d51f7c2ab803
+Revises: c3e8a1f2d9b4
+Create Date: 2026-10-19 10:04:17.562094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd51f7c2ab803'
+down_revision: Union[str, Sequence[str], None] = 'c3e8a1f2d9b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # order_items(order_id) is already covered by the (order_id, product_id) primary key
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('orders')]
+
+    # Build without blocking writes to orders
+    with op.get_context().autocommit_block():
+        if 'ix_orders_user_id_created_at' not in existing_indexes:
+            op.create_index('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], unique=False, postgresql_concurrently=True)
+        if 'ix_orders_created_at_id' not in existing_indexes:
+            op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
+    op.drop_index('ix_orders_user_id_created_at', table_name='orders')
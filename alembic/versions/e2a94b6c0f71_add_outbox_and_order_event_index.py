@@ -0,0 +1,51 @@
+"""add_outbox_and_order_event_index
+
+Revision ID: e2a94b6c0f71
+Revises: d51f7c2ab803
+Create Date: 2026-10-19 11:27:53.904411
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a94b6c0f71'
+down_revision: Union[str, Sequence[str], None] = 'd51f7c2ab803'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check if table/index already exist (for existing databases)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+
+    if 'outbox_messages' not in inspector.get_table_names():
+        op.create_table('outbox_messages',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('topic', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('dispatched_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_outbox_messages_pending', 'outbox_messages', ['next_attempt_at', 'id'], unique=False, postgresql_where=sa.text('dispatched_at IS NULL'))
+
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('order_events')]
+    if 'ix_order_events_order_id_created_at' not in existing_indexes:
+        op.create_index('ix_order_events_order_id_created_at', 'order_events', ['order_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_order_events_order_id_created_at', table_name='order_events')
+    op.drop_index('ix_outbox_messages_pending', table_name='outbox_messages')
+    op.drop_table('outbox_messages')
@@ -0,0 +1,51 @@
+"""add_daily_rollups
+
+Revision ID: f7b0c3d18e25
+Revises: e2a94b6c0f71
+Create Date: 2026-10-19 13:02:11.475806
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b0c3d18e25'
+down_revision: Union[str, Sequence[str], None] = 'e2a94b6c0f71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Check if tables already exist (for existing databases)
+    # Populate afterwards with: python -m app.services.rollup_service --since <first day>
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_tables = inspector.get_table_names()
+
+    if 'daily_stats' not in existing_tables:
+        op.create_table('daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('scans', sa.Integer(), nullable=False),
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('day')
+        )
+
+    if 'daily_disease_counts' not in existing_tables:
+        op.create_table('daily_disease_counts',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('disease_name', sa.String(length=200), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'disease_name')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_disease_counts')
+    op.drop_table('daily_stats')
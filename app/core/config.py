@@ -17,6 +17,21 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: Optional[str] = None
 
+    # Optional read replica for read-only endpoints (see app.db.replica)
+    DATABASE_REPLICA_URL: Optional[str] = None
+    REPLICA_MAX_LAG_SECONDS: float = 5  # read from the primary while the replica is further behind
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 5
+    READ_YOUR_WRITES_SECONDS: float = 10  # a user's reads stay on the primary this long after a write
+
+    # Connection pool (per worker process)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30  # wait for a free connection before failing
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # replace connections older than this
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements kept per connection
+    DB_PGBOUNCER: bool = False  # PgBouncer transaction pooling: disables statement caching
+
     @property
     def database_url(self) -> str:
         # If DATABASE_URL is provided (cloud), use it directly
@@ -38,6 +53,13 @@ class Settings(BaseSettings):
             f"{self.POSTGRES_DB}"
         )
 
+    @property
+    def database_replica_url(self) -> Optional[str]:
+        url = self.DATABASE_REPLICA_URL
+        if url and "postgresql://" in url and "+asyncpg" not in url:
+            return url.replace("postgresql://", "postgresql+asyncpg://")
+        return url
+
     @property
     def database_url_sync(self) -> str:
         # SYNC (Alembic only) - convert asyncpg to psycopg2
@@ -58,12 +80,84 @@ class Settings(BaseSettings):
     TWILIO_PHONE: str
     TWILIO_VERIFY_SERVICE_SID: str
 
+    # OTP delivery: "twilio" (Verify API) or "fake" (in-memory, local/tests)
+    OTP_PROVIDER: str = "twilio"
+    OTP_FAKE_CODE: Optional[str] = None  # fixed code for the fake provider
+    OTP_HTTP_TIMEOUT_SECONDS: float = 5.0
+    OTP_HTTP_MAX_CONNECTIONS: int = 50
+    OTP_HTTP_RETRIES: int = 2
+
     #Security
     SECRET_KEY: str
 
     # OpenAI
     OPENAI_API_KEY: str
 
+    # Rate limiting: "postgres" shares limits across workers, "memory" is per process
+    RATE_LIMIT_BACKEND: str = "postgres"
+    RATE_LIMIT_MEMORY_MAX_KEYS: int = 100000
+    OTP_RATE_LIMIT: int = 3  # OTP requests per phone per window
+    OTP_RATE_WINDOW_SECONDS: int = 3600
+    ANALYZE_RATE_LIMIT: int = 30  # plant analyses per user per window
+    ANALYZE_RATE_WINDOW_SECONDS: int = 3600
+
+    # Refresh-token sessions
+    SESSION_TTL_DAYS: int = 7
+    SESSION_MAX_PER_USER: int = 5  # oldest sessions are dropped beyond this
+    SESSION_CACHE_TTL_SECONDS: int = 30
+    SESSION_SWEEPER_ENABLED: bool = True
+    SESSION_SWEEP_INTERVAL_SECONDS: int = 300
+    SESSION_SWEEP_BATCH_SIZE: int = 1000
+
+    # Access token verification
+    JWT_BACKEND: str = "jose"  # or "pyjwt" (needs PyJWT installed)
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+
+    # Role cache (admin authorization)
+    ROLE_CACHE_TTL_SECONDS: int = 60
+
+    # Warn (in DEBUG) when a request issues more SQL statements than this
+    QUERY_BUDGET_PER_REQUEST: int = 20
+
+    # SQL statement stats (per route, see /admin/db/statements) and slow-query log
+    SLOW_QUERY_THRESHOLD_MS: float = 200
+    STATEMENT_STATS_MAX_ENTRIES: int = 2000
+
+    # Idempotency
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: int = 120  # in-flight claims older than this can be retaken
+    IDEMPOTENCY_SWEEPER_ENABLED: bool = True
+    IDEMPOTENCY_SWEEP_INTERVAL_SECONDS: int = 600
+    IDEMPOTENCY_SWEEP_BATCH_SIZE: int = 1000
+
+    # Order notifications (outbox)
+    OUTBOX_DISPATCHER_ENABLED: bool = True
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_RETENTION_HOURS: int = 72
+    ORDER_WEBHOOK_URL: Optional[str] = None
+
+    # Order status streaming (SSE)
+    ORDER_STREAM_ENABLED: bool = True
+    ORDER_STREAM_HEARTBEAT_SECONDS: int = 15
+    ORDER_STREAM_RETRY_MS: int = 3000
+    # Resume also re-sends events created this long before Last-Event-ID, which
+    # may have committed after it (outbox ids are taken before commit)
+    ORDER_STREAM_REPLAY_OVERLAP_SECONDS: int = 30
+
+    # Admin analytics aggregation
+    ANALYTICS_AGGREGATOR_ENABLED: bool = True
+    ANALYTICS_INTERVAL_SECONDS: float = 60
+    ANALYTICS_SETTLE_SECONDS: int = 60  # raw rows younger than this wait for the next pass
+    ANALYTICS_ATTRIBUTION_DAYS: int = 30  # an order converts a recommendation made this many days before
+
+    # Outbreak detection over geohash cells
+    OUTBREAK_WINDOW_DAYS: int = 7
+    OUTBREAK_BASELINE_DAYS: int = 28
+    OUTBREAK_MIN_COUNT: int = 5  # ignore cells with fewer recent scans than this
+    OUTBREAK_RATIO: float = 3.0  # recent daily rate must exceed baseline rate by this factor
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
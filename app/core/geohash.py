@@ -0,0 +1,57 @@
+from typing import Tuple
+
+# Geohash cells nest by prefix: a scan's stored hash truncated to N characters
+# is its cell at that precision, so coarser buckets are plain string prefixes.
+#   precision 4 ~ 39km x 20km  (analytics regions)
+#   precision 5 ~ 4.9km x 4.9km (heatmap / outbreak cells)
+#   precision 7 ~ 153m x 153m  (stored on each scan)
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: index for index, char in enumerate(_BASE32)}
+
+SCAN_PRECISION = 7
+REGION_PRECISION = 4
+CELL_PRECISION = 5
+
+
+def encode(latitude: float, longitude: float, precision: int = SCAN_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # bits alternate longitude, latitude
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            interval[0] = mid
+        else:
+            bits <<= 1
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Center (latitude, longitude) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        index = _DECODE[char]
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if (index >> shift) & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
@@ -22,6 +22,11 @@ class JsonFormatter(logging.Formatter):
         if request_id:
             log["request_id"] = request_id
 
+        # Structured fields passed as logger.x(..., extra={"fields": {...}})
+        fields = getattr(record, "fields", None)
+        if fields:
+            log.update(fields)
+
         if record.exc_info:
             log["exception"] = self.formatException(record.exc_info)
 
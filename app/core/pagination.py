@@ -0,0 +1,45 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Keyset cursors encode the (created_at, id) of the last row on a page.
+# Clients treat them as opaque strings and pass them back as ?cursor=...
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, UUID]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(query, created_at_column, id_column, cursor: Optional[str], limit: int):
+    """Order newest first and continue after the cursor row; fetches one extra row to detect a next page"""
+    position = decode_cursor(cursor)
+    if position:
+        query = query.where(tuple_(created_at_column, id_column) < position)
+    return query.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+def paginate(response: Response, rows: list, limit: int) -> list:
+    """Trim the look-ahead row and expose the next cursor as a header. Rows need created_at and id."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+    return rows
@@ -0,0 +1,58 @@
+import logging
+from typing import AsyncIterator
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.config import get_settings
+from app.core.logging import request_id_ctx
+from app.db.query_stats import QueryStats, query_stats_ctx, statement_stats
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class QueryBudgetMiddleware(BaseHTTPMiddleware):
+    """
+    Counts the SQL statements each request issues. In DEBUG, reports them in
+    X-DB-Queries / X-DB-Time-Ms headers and warns when a request exceeds
+    QUERY_BUDGET_PER_REQUEST, which is how N+1 loops show up.
+    Statement totals are added to statement_stats under the route once the
+    body has been sent, so statements run by streaming responses are included.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        stats = QueryStats(request_id_ctx.get(), f"{request.method} {request.url.path}")
+        token = query_stats_ctx.set(stats)
+        try:
+            response = await call_next(request)
+        except BaseException:
+            _merge(request, stats)
+            raise
+        finally:
+            query_stats_ctx.reset(token)
+
+        # The endpoint task still holds query_stats_ctx while the body streams
+        response.body_iterator = _merge_when_sent(response.body_iterator, request, stats)
+
+        if settings.DEBUG:
+            response.headers["X-DB-Queries"] = str(stats.statements)
+            response.headers["X-DB-Time-Ms"] = f"{stats.elapsed_ms:.1f}"
+            if stats.statements > settings.QUERY_BUDGET_PER_REQUEST:
+                logger.warning(
+                    f"{request.method} {request.url.path} issued {stats.statements} SQL statements "
+                    f"({stats.elapsed_ms:.1f} ms), budget is {settings.QUERY_BUDGET_PER_REQUEST}"
+                )
+        return response
+
+
+def _merge(request: Request, stats: QueryStats) -> None:
+    # The router leaves the matched route in the (shared) scope
+    route = request.scope.get("route")
+    statement_stats.merge(f"{request.method} {getattr(route, 'path', '(unmatched)')}", stats)
+
+
+async def _merge_when_sent(body_iterator: AsyncIterator[bytes], request: Request, stats: QueryStats):
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        _merge(request, stats)
@@ -0,0 +1,17 @@
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.db import replica
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    """After an authenticated write, keep that user's reads on the primary for a while"""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        if replica.replica_session is not None and request.method not in SAFE_METHODS:
+            user_id = replica.request_user_id(request)
+            if user_id:
+                replica.mark_write(user_id)
+        return response
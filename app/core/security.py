@@ -1,13 +1,24 @@
+import hashlib
+import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Any
+from typing import Optional, Any, List
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 
+try:
+    import jwt as pyjwt  # PyJWT: optional alternative decoder (JWT_BACKEND=pyjwt)
+except ImportError:
+    pyjwt = None
+
+logger = logging.getLogger(__name__)
+
 # -------------------------------------------------------------------
 # CONFIG
 # -------------------------------------------------------------------
@@ -17,6 +28,19 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days (good for farmer apps)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+ROLES_CLAIM = "roles"
+
+# token digest -> verified claims; entries never outlive the token's exp
+token_cache = TTLCache(
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+)
+
+if settings.JWT_BACKEND == "pyjwt" and pyjwt is None:
+    logger.warning("JWT_BACKEND=pyjwt but PyJWT is not installed; using python-jose")
+_use_pyjwt = settings.JWT_BACKEND == "pyjwt" and pyjwt is not None
+_TOKEN_ERRORS = (JWTError, pyjwt.PyJWTError) if pyjwt else (JWTError,)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # -------------------------------------------------------------------
@@ -38,10 +62,12 @@ def create_access_token(
     subject: str | int,
     expires_delta: Optional[timedelta] = None,
     extra_claims: Optional[dict[str, Any]] = None,
+    roles: Optional[List[str]] = None,
 ) -> str:
     """
     subject → usually user_id
-    extra_claims → role, phone, etc.
+    roles → user's roles, checked by require_role
+    extra_claims → phone, etc.
     """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -54,6 +80,9 @@ def create_access_token(
         "iat": datetime.utcnow(),
     }
 
+    if roles is not None:
+        to_encode[ROLES_CLAIM] = sorted(roles)
+
     if extra_claims:
         to_encode.update(extra_claims)
 
@@ -65,21 +94,40 @@ def create_access_token(
     return encoded_jwt
 
 
+def _verify_token(token: str) -> dict[str, Any]:
+    """Full signature and claim check. Raises JWTError (or PyJWT's error)."""
+    if _use_pyjwt:
+        return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+
+
 def decode_access_token(token: str) -> dict[str, Any]:
-    try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[ALGORITHM],
-        )
+    """
+    Verified claims for token. Tokens seen recently are answered from
+    token_cache without re-verifying. Callers must not mutate the result.
+    """
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = token_cache.get(key)
+    if payload is not None:
         return payload
-    except JWTError:
+
+    try:
+        payload = _verify_token(token)
+    except _TOKEN_ERRORS:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    exp = payload.get("exp")
+    token_cache.set(key, payload, exp - time.time() if isinstance(exp, (int, float)) else None)
+    return payload
+
+
+def token_cache_stats() -> dict[str, Any]:
+    return {**token_cache.stats(), "backend": "pyjwt" if _use_pyjwt else "jose"}
+
 # -------------------------------------------------------------------
 # FASTAPI DEPENDENCIES
 # -------------------------------------------------------------------
@@ -97,24 +145,45 @@ def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
     return user_id
 
 
-def get_current_user_role(token: str = Depends(oauth2_scheme)) -> Optional[str]:
-    payload = decode_access_token(token)
-    return payload.get("role")
+def token_roles(payload: dict[str, Any]) -> Optional[List[str]]:
+    """Roles carried by a token; None for tokens issued before roles were embedded"""
+    roles = payload.get(ROLES_CLAIM)
+    if roles is None:
+        legacy_role = payload.get("role")
+        return [legacy_role] if legacy_role else None
+    return list(roles)
 
 
-def require_role(required_role: str):
+def require_role(required_role: str, fresh: bool = False):
     """
     Usage:
-    Depends(require_role("admin"))
+    user_id: str = Depends(require_role("admin"))
+
+    The role is checked against the token's claim without touching the
+    database. With fresh=True it must also still be held according to the
+    role cache, so revocations apply within ROLE_CACHE_TTL_SECONDS instead of
+    at token expiry. Tokens without a roles claim fall back to the cache.
     """
-    def role_dependency(token: str = Depends(oauth2_scheme)) -> None:
+    async def role_dependency(token: str = Depends(oauth2_scheme)) -> str:
         payload = decode_access_token(token)
-        role = payload.get("role")
+        user_id: str | None = payload.get("sub")
+        if user_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication credentials",
+            )
+
+        claimed = token_roles(payload)
+        allowed = claimed is None or required_role in claimed
+        if allowed and (fresh or claimed is None):
+            from app.services.role_service import RoleService
+            allowed = required_role in await RoleService.get_roles(user_id)
 
-        if role != required_role:
+        if not allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Insufficient permissions",
             )
+        return user_id
 
     return role_dependency
@@ -12,6 +12,17 @@ from app.db.models.cart_items import CartItem
 from app.db.models.orders import Order
 from app.db.models.order_items import OrderItem
 from app.db.models.order_events import OrderEvent
+from app.db.models.idempotency_keys import IdempotencyKey
+from app.db.models.outbox_messages import OutboxMessage
+from app.db.models.daily_stats import DailyStat
+from app.db.models.daily_disease_counts import DailyDiseaseCount
+from app.db.models.analytics_disease_regions import AnalyticsDiseaseRegion
+from app.db.models.analytics_product_funnel import AnalyticsProductFunnel
+from app.db.models.analytics_monthly_active_users import AnalyticsMonthlyActiveUser
+from app.db.models.analytics_watermarks import AnalyticsWatermark
+from app.db.models.geo_disease_counts import GeoDiseaseCount
+from app.db.models.geo_outbreaks import GeoOutbreak
+from app.db.models.rate_limits import RateLimitState
 
 __all__ = [
     "User",
@@ -28,4 +39,15 @@ __all__ = [
     "Order",
     "OrderItem",
     "OrderEvent",
+    "IdempotencyKey",
+    "OutboxMessage",
+    "DailyStat",
+    "DailyDiseaseCount",
+    "AnalyticsDiseaseRegion",
+    "AnalyticsProductFunnel",
+    "AnalyticsMonthlyActiveUser",
+    "AnalyticsWatermark",
+    "GeoDiseaseCount",
+    "GeoOutbreak",
+    "RateLimitState",
 ]
\ No newline at end of file
@@ -0,0 +1,12 @@
+from sqlalchemy import Date, Integer, String
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class AnalyticsDiseaseRegion(Base):
+    __tablename__ = "analytics_disease_regions"
+
+    day = mapped_column(Date, primary_key=True)
+    region = mapped_column(String(50), primary_key=True)
+    disease_name = mapped_column(String(200), primary_key=True)
+    count = mapped_column(Integer, nullable=False, default=0)
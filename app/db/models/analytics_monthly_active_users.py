@@ -0,0 +1,11 @@
+from sqlalchemy import Date
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class AnalyticsMonthlyActiveUser(Base):
+    __tablename__ = "analytics_monthly_active_users"
+
+    month = mapped_column(Date, primary_key=True)  # first day of the month
+    user_id = mapped_column(UUID(as_uuid=True), primary_key=True)
@@ -0,0 +1,13 @@
+from sqlalchemy import Date, Integer, ForeignKey
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class AnalyticsProductFunnel(Base):
+    __tablename__ = "analytics_product_funnel"
+
+    day = mapped_column(Date, primary_key=True)
+    product_id = mapped_column(ForeignKey("products.id"), primary_key=True)
+    recommendations = mapped_column(Integer, nullable=False, default=0)  # times recommended after a scan
+    orders = mapped_column(Integer, nullable=False, default=0)  # orders attributed to a prior recommendation
+    units = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,10 @@
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class AnalyticsWatermark(Base):
+    __tablename__ = "analytics_watermarks"
+
+    source = mapped_column(String(50), primary_key=True)  # raw table the aggregator consumes
+    processed_until = mapped_column(DateTime, nullable=False)
@@ -1,5 +1,5 @@
 from uuid import uuid4
-from sqlalchemy import ForeignKey, Boolean
+from sqlalchemy import ForeignKey, Boolean, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column
 from app.db.base import Base
@@ -7,6 +7,9 @@ from app.db.base import Base
 
 class Cart(Base):
     __tablename__ = "carts"
+    __table_args__ = (
+        Index("ix_carts_user_id_is_active", "user_id", "is_active"),
+    )
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id = mapped_column(ForeignKey("users.id"))
@@ -0,0 +1,12 @@
+from sqlalchemy import Date, Integer, SmallInteger, String
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class DailyDiseaseCount(Base):
+    __tablename__ = "daily_disease_counts"
+
+    day = mapped_column(Date, primary_key=True)
+    disease_name = mapped_column(String(200), primary_key=True)  # normalized, see RollupService
+    shard = mapped_column(SmallInteger, primary_key=True, default=0, server_default="0")  # readers sum over shards
+    count = mapped_column(Integer, nullable=False, default=0)
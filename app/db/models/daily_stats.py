@@ -0,0 +1,13 @@
+from sqlalchemy import Date, Integer, Numeric, SmallInteger
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class DailyStat(Base):
+    __tablename__ = "daily_stats"
+
+    day = mapped_column(Date, primary_key=True)
+    shard = mapped_column(SmallInteger, primary_key=True, default=0, server_default="0")  # see RollupService; readers sum over shards
+    scans = mapped_column(Integer, nullable=False, default=0)
+    orders = mapped_column(Integer, nullable=False, default=0)
+    revenue = mapped_column(Numeric(14,2), nullable=False, default=0)
@@ -0,0 +1,12 @@
+from sqlalchemy import Date, Integer, String
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class GeoDiseaseCount(Base):
+    __tablename__ = "geo_disease_counts"
+
+    day = mapped_column(Date, primary_key=True)
+    cell = mapped_column(String(12), primary_key=True)  # geohash at CELL_PRECISION
+    disease_name = mapped_column(String(200), primary_key=True)
+    count = mapped_column(Integer, nullable=False, default=0)
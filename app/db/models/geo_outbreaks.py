@@ -0,0 +1,18 @@
+from sqlalchemy import Date, DateTime, Integer, String, Index
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+from sqlalchemy.sql import func
+
+
+class GeoOutbreak(Base):
+    __tablename__ = "geo_outbreaks"
+    __table_args__ = (
+        Index("ix_geo_outbreaks_cell", "cell", "day"),
+    )
+
+    day = mapped_column(Date, primary_key=True)  # last day of the window that tripped the detector
+    cell = mapped_column(String(12), primary_key=True)
+    disease_name = mapped_column(String(200), primary_key=True)
+    recent_count = mapped_column(Integer, nullable=False)  # scans in the detection window
+    baseline_count = mapped_column(Integer, nullable=False)  # scans in the baseline period before it
+    detected_at = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
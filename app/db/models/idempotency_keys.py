@@ -0,0 +1,15 @@
+from sqlalchemy import String, DateTime, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    user_id = mapped_column(UUID(as_uuid=True), primary_key=True)
+    key = mapped_column(String(255), primary_key=True)
+    scope = mapped_column(String(100), nullable=False)  # e.g. "POST /orders"
+    response_json = mapped_column(JSON, nullable=True)  # NULL while the first request is in flight
+    created_at = mapped_column(DateTime, nullable=False)
+    expires_at = mapped_column(DateTime, nullable=False, index=True)
@@ -1,5 +1,5 @@
 from uuid import uuid4
-from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy import String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.sql import func
@@ -8,8 +8,11 @@ from app.db.base import Base
 
 class OrderEvent(Base):
     __tablename__ = "order_events"
+    __table_args__ = (
+        Index("ix_order_events_order_id_created_at", "order_id", "created_at"),
+    )
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     order_id = mapped_column(ForeignKey("orders.id"))
-    event = mapped_column(String)
+    event = mapped_column(String)  # placed, shipped, delivered, cancelled
     created_at = mapped_column(DateTime, default=func.now())
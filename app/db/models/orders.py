@@ -1,17 +1,23 @@
 from uuid import uuid4
-from sqlalchemy import String, DateTime, ForeignKey, Numeric
+from sqlalchemy import String, DateTime, ForeignKey, Numeric, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.sql import func
 from app.db.base import Base
 
+ORDER_STATUSES = ("placed", "shipped", "delivered", "cancelled")
+
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id = mapped_column(ForeignKey("users.id"))
-    status = mapped_column(String(30))  # placed, shipped, delivered
+    status = mapped_column(String(30))  # one of ORDER_STATUSES
     total_amount = mapped_column(Numeric(10,2))
     address = mapped_column(String(500), nullable=True)  # Delivery address
     created_at = mapped_column(DateTime, default=func.now())
@@ -0,0 +1,30 @@
+from sqlalchemy import BigInteger, String, Text, Integer, DateTime, JSON, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import mapped_column
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        # Only undelivered rows are scanned by the dispatcher
+        Index(
+            "ix_outbox_messages_pending",
+            "next_attempt_at",
+            "id",
+            postgresql_where=text("dispatched_at IS NULL"),
+        ),
+        # Order stream resume (Last-Event-ID) reads one user's events
+        Index("ix_outbox_messages_user_id_id", "user_id", "id"),
+    )
+
+    id = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    topic = mapped_column(String(100), nullable=False)  # e.g. order.status_changed
+    user_id = mapped_column(UUID(as_uuid=True), nullable=True)  # user the event belongs to, if any
+    payload = mapped_column(JSON, nullable=False)
+    attempts = mapped_column(Integer, nullable=False, default=0)
+    last_error = mapped_column(Text, nullable=True)
+    created_at = mapped_column(DateTime, nullable=False, server_default=func.now())
+    next_attempt_at = mapped_column(DateTime, nullable=False, server_default=func.now())
+    dispatched_at = mapped_column(DateTime, nullable=True)
@@ -1,5 +1,5 @@
 from uuid import uuid4
-from sqlalchemy import String, DateTime, ForeignKey, Boolean
+from sqlalchemy import String, DateTime, ForeignKey, Boolean, Float, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column
 from app.db.base import Base
@@ -7,6 +7,17 @@ from sqlalchemy.sql import func
 
 class PlantScan(Base):
     __tablename__ = "plant_scans"
+    __table_args__ = (
+        Index("ix_plant_scans_created_at_id", "created_at", "id"),
+        Index("ix_plant_scans_user_id_created_at", "user_id", "created_at"),
+        # Prefix lookups (geohash LIKE 'tdr1%') over geotagged scans only
+        Index(
+            "ix_plant_scans_geohash",
+            "geohash",
+            postgresql_ops={"geohash": "varchar_pattern_ops"},
+            postgresql_where=text("geohash IS NOT NULL")
+        ),
+    )
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id = mapped_column(UUID(as_uuid=True), nullable=False)
@@ -16,4 +27,7 @@ class PlantScan(Base):
     image_hash_md5 = mapped_column(String, nullable=True, index=True)  # MD5 for exact duplicates
     is_duplicate = mapped_column(Boolean, default=False)  # Flag for duplicate scans
     original_scan_id = mapped_column(UUID(as_uuid=True), ForeignKey("plant_scans.id"), nullable=True)  # Reference to original
+    latitude = mapped_column(Float, nullable=True)
+    longitude = mapped_column(Float, nullable=True)
+    geohash = mapped_column(String(12), nullable=True)  # see app.core.geohash
     created_at = mapped_column(DateTime, server_default=func.now())
@@ -1,5 +1,5 @@
 from uuid import uuid4
-from sqlalchemy import ForeignKey, Text
+from sqlalchemy import ForeignKey, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column
 from app.db.base import Base
@@ -7,6 +7,9 @@ from app.db.base import Base
 
 class ProductImage(Base):
     __tablename__ = "product_images"
+    __table_args__ = (
+        Index("ix_product_images_product_id", "product_id"),
+    )
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     product_id = mapped_column(ForeignKey("products.id"))
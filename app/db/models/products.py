@@ -9,6 +9,7 @@ class Product(Base):
     __tablename__ = "products"
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    sku = mapped_column(String(100), unique=True, index=True, nullable=True)  # distributor SKU, key for bulk import
     name = mapped_column(String)
     description = mapped_column(Text)
     price = mapped_column(Numeric(10,2))
@@ -0,0 +1,15 @@
+from sqlalchemy import String, Float, Index
+from sqlalchemy.orm import mapped_column
+from app.db.base import Base
+
+
+class RateLimitState(Base):
+    """GCRA state per key, see app.services.rate_limiter. UNLOGGED: lost on crash, by design."""
+    __tablename__ = "rate_limits"
+    __table_args__ = (
+        Index("ix_rate_limits_tat", "tat"),
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+    key = mapped_column(String(200), primary_key=True)
+    tat = mapped_column(Float, nullable=False)  # theoretical arrival time, epoch seconds
@@ -1,14 +1,43 @@
 from uuid import uuid4
-from sqlalchemy import DateTime, ForeignKey, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import DateTime, ForeignKey, String, Float, Boolean, Computed, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import mapped_column
 from app.db.base import Base
 from sqlalchemy.sql import func
 
 class ScanResult(Base):
     __tablename__ = "scan_results"
+    __table_args__ = (
+        Index("ix_scan_results_result_json", "result_json", postgresql_using="gin"),
+        # Review queue: only flagged rows are indexed
+        Index("ix_scan_results_needs_review", "created_at", postgresql_where=text("needs_review")),
+    )
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    scan_id = mapped_column(UUID(as_uuid=True), ForeignKey("plant_scans.id"), nullable=False)
-    result_json = mapped_column(JSON, nullable=False)
-    created_at = mapped_column(DateTime, server_default=func.now())
+    scan_id = mapped_column(UUID(as_uuid=True), ForeignKey("plant_scans.id"), nullable=False, index=True)
+    result_json = mapped_column(JSONB, nullable=False)
+    created_at = mapped_column(DateTime, server_default=func.now(), index=True)  # analytics windows
+
+    # Generated from result_json by Postgres; never written by the app
+    disease_name = mapped_column(
+        String(200),
+        Computed("substr(initcap(btrim(result_json ->> 'disease_name')), 1, 200)", persisted=True),
+        index=True
+    )
+    consensus_confidence = mapped_column(
+        Float,
+        Computed(
+            "CASE WHEN jsonb_typeof(result_json -> 'consensus_confidence') = 'number' "
+            "THEN (result_json ->> 'consensus_confidence')::double precision END",
+            persisted=True
+        ),
+        index=True
+    )
+    needs_review = mapped_column(
+        Boolean,
+        Computed(
+            "CASE WHEN jsonb_typeof(result_json -> 'needs_review') = 'boolean' "
+            "THEN (result_json ->> 'needs_review')::boolean END",
+            persisted=True
+        )
+    )
@@ -1,5 +1,5 @@
 from uuid import uuid4
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import String, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import mapped_column
 from app.db.base import Base
@@ -7,6 +7,9 @@ from app.db.base import Base
 
 class UserRole(Base):
     __tablename__ = "user_roles"
+    __table_args__ = (
+        Index("ix_user_roles_user_id_role", "user_id", "role"),
+    )
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id = mapped_column(ForeignKey("users.id"))
@@ -1,13 +1,20 @@
 from uuid import uuid4
-from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy import DateTime, ForeignKey, LargeBinary, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
 from app.db.base import Base  # Make sure Base is defined in base.py
 
 class UserSession(Base):
     __tablename__ = "user_sessions"
+    __table_args__ = (
+        Index("ix_user_sessions_user_id_created_at", "user_id", "created_at"),  # per-user session cap
+        Index("ix_user_sessions_expires_at", "expires_at"),  # expiry sweeper
+    )
 
     id: Mapped[UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id: Mapped[UUID] = mapped_column(ForeignKey("users.id"))
-    token: Mapped[str] = mapped_column(String, unique=True)
+    # SHA-256 of the refresh token; the token itself is never stored
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(32), unique=True, nullable=False)
     expires_at: Mapped[DateTime] = mapped_column(DateTime)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
@@ -0,0 +1,327 @@
+"""
+Query-plan check. Seeds a realistic volume of rows into a scratch Postgres,
+runs the real query code of the routers, services and analytics aggregators
+against them, EXPLAINs every statement that code sends, and exits non-zero
+if any of them reads a seeded table with a sequential scan. It also fails
+when a foreign key column doesn't lead an index (unless listed in
+UNINDEXED_FK_ALLOWED), so a new relationship can't ship unindexed.
+
+    DATABASE_URL=postgresql://localhost/agricure_plans alembic upgrade head
+    DATABASE_URL=postgresql://localhost/agricure_plans python -m app.db.plan_check
+
+Point it at a freshly migrated, empty database: the seed rows are rolled
+back afterwards, but ANALYZE leaves the inflated table statistics behind.
+Each check calls the same helper the endpoint or worker uses (a statement
+builder such as uploads_query, or a function taking the session), so a
+changed query is checked as it now is. When adding an endpoint with a new
+query, give it such a helper and add a call to _checks().
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from sqlalchemy import UniqueConstraint, event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.pagination import apply_keyset
+from app.db.base import Base
+from app.db.models import Order, PlantScan
+from app.db.session import engine
+from app.routers import admin, orders, plant
+from app.routers.cart import _get_cart_internal
+from app.routers.products import get_product
+from app.services import analytics_service
+from app.services.role_service import RoleService
+from app.services.session_store import SessionStore, resolve_query
+
+# Rows per parent at scale 1.0: ~20k users, 60k carts, 60k orders, 100k scans
+SEED = {
+    "users": 20000,
+    "products": 2000,
+    "images_per_product": 2,
+    "carts_per_user": 3,  # one active, the rest checked out
+    "items_per_cart": 3,
+    "orders_per_user": 3,
+    "items_per_order": 2,
+    "scans_per_user": 5,
+    # Analytics buckets: two years of days x regions / cells / recommended products
+    "analytics_days": 730,
+    "regions": 50,
+    "cells": 100,
+    "funnel_products": 200,
+}
+
+SEEDED_TABLES = (
+    "users", "products", "product_inventory", "product_images", "user_roles", "user_sessions",
+    "carts", "cart_items", "orders", "order_items", "plant_scans", "scan_results",
+    "analytics_disease_regions", "analytics_product_funnel", "analytics_monthly_active_users",
+    "geo_disease_counts", "geo_outbreaks",
+)
+# daily_stats holds a few rows per day; a sequential scan is the right plan there
+
+SEED_DISEASES = "ARRAY['Leaf Blight', 'Rust', 'Healthy', 'Powdery Mildew']"
+
+# (table, column) -> why no index is needed
+UNINDEXED_FK_ALLOWED = {
+    ("cart_items", "product_id"): "products are soft-deleted; items are read by cart",
+    ("order_items", "product_id"): "products are soft-deleted; items are read by order",
+    ("scan_product_recommendations", "product_id"): "products are soft-deleted; read by scan",
+    ("analytics_product_funnel", "product_id"): "read by day range",
+    ("plant_scans", "original_scan_id"): "scans are never deleted; only followed from the duplicate",
+}
+
+_SEED_SQL = [
+    """INSERT INTO users (id, phone, name, language, is_active, created_at)
+       SELECT gen_random_uuid(), '+91' || lpad(g::text, 10, '0'), 'Farmer ' || g, 'en', true,
+              localtimestamp - random() * interval '365 days'
+       FROM generate_series(1, {users}) g""",
+    """INSERT INTO products (id, name, description, price, is_active)
+       SELECT gen_random_uuid(), 'Product ' || g, 'Seeded product', round((random() * 1000)::numeric, 2), g % 10 <> 0
+       FROM generate_series(1, {products}) g""",
+    "INSERT INTO product_inventory (product_id, quantity) SELECT id, 100 FROM products",
+    """INSERT INTO product_images (id, product_id, image_url)
+       SELECT gen_random_uuid(), p.id, 'https://images.example/' || p.id || '/' || k || '.jpg'
+       FROM products p CROSS JOIN generate_series(1, {images_per_product}) k""",
+    "INSERT INTO user_roles (id, user_id, role) SELECT gen_random_uuid(), id, 'farmer' FROM users",
+    """INSERT INTO user_sessions (id, user_id, token_hash, expires_at, created_at)
+       SELECT gen_random_uuid(), id, sha256(id::text::bytea), localtimestamp + interval '30 days', localtimestamp
+       FROM users""",
+    """INSERT INTO carts (id, user_id, is_active)
+       SELECT gen_random_uuid(), u.id, k = 1
+       FROM users u CROSS JOIN generate_series(1, {carts_per_user}) k""",
+    # k * 101 keeps each cart's products distinct for its (cart_id, product_id) key
+    """WITH p AS (SELECT id, row_number() OVER (ORDER BY id) AS rn FROM products)
+       INSERT INTO cart_items (cart_id, product_id, quantity)
+       SELECT c.id, p.id, k
+       FROM carts c CROSS JOIN generate_series(1, {items_per_cart}) k
+       JOIN p ON p.rn = (abs(hashtext(c.id::text)::bigint) + k * 101) % {products} + 1""",
+    """INSERT INTO orders (id, user_id, status, total_amount, address, created_at)
+       SELECT gen_random_uuid(), u.id, 'delivered', 500, 'Seeded address',
+              localtimestamp - random() * interval '365 days'
+       FROM users u CROSS JOIN generate_series(1, {orders_per_user}) k""",
+    """WITH p AS (SELECT id, row_number() OVER (ORDER BY id) AS rn FROM products)
+       INSERT INTO order_items (order_id, product_id, quantity, price)
+       SELECT o.id, p.id, k, 250
+       FROM orders o CROSS JOIN generate_series(1, {items_per_order}) k
+       JOIN p ON p.rn = (abs(hashtext(o.id::text)::bigint) + k * 101) % {products} + 1""",
+    """INSERT INTO plant_scans (id, user_id, image_filename, image_hash_md5, image_hash_phash, is_duplicate, created_at)
+       SELECT gen_random_uuid(), u.id, 'scan.jpg', md5(random()::text), substr(md5(random()::text), 1, 16), false,
+              localtimestamp - random() * interval '365 days'
+       FROM users u CROSS JOIN generate_series(1, {scans_per_user}) k""",
+    """INSERT INTO scan_results (id, scan_id, result_json, created_at)
+       SELECT gen_random_uuid(), s.id,
+              jsonb_build_object(
+                  'disease_name', ({diseases})[1 + floor(random() * 4)::int],
+                  'consensus_confidence', round(random()::numeric, 2),
+                  'needs_review', random() < 0.05
+              ),
+              s.created_at
+       FROM plant_scans s""",
+    """INSERT INTO analytics_disease_regions (day, region, disease_name, count)
+       SELECT current_date - d, 'tdr' || lpad(r::text, 2, '0'), disease, 1 + floor(random() * 20)::int
+       FROM generate_series(0, {analytics_days} - 1) d
+       CROSS JOIN generate_series(1, {regions}) r
+       CROSS JOIN unnest({diseases}) disease""",
+    """INSERT INTO analytics_product_funnel (day, product_id, recommendations, orders, units)
+       SELECT current_date - d, p.id, 10, 2, 3
+       FROM generate_series(0, {analytics_days} - 1) d
+       CROSS JOIN (SELECT id FROM products LIMIT {funnel_products}) p""",
+    """INSERT INTO analytics_monthly_active_users (month, user_id)
+       SELECT DISTINCT date_trunc('month', created_at)::date, user_id FROM plant_scans""",
+    """INSERT INTO geo_disease_counts (day, cell, disease_name, count)
+       SELECT current_date - d, 'tdr' || lpad(c::text, 2, '0'), disease, 1 + floor(random() * 20)::int
+       FROM generate_series(0, {analytics_days} - 1) d
+       CROSS JOIN generate_series(1, {cells}) c
+       CROSS JOIN unnest({diseases}) disease""",
+    """INSERT INTO geo_outbreaks (day, cell, disease_name, recent_count, baseline_count)
+       SELECT current_date - d, 'tdr' || lpad(c::text, 2, '0'), 'Rust', 30, 5
+       FROM generate_series(0, {analytics_days} - 1) d
+       CROSS JOIN generate_series(1, 10) c""",
+]
+
+
+def unindexed_foreign_keys() -> List[str]:
+    """Foreign key columns (per the models) that no index or key leads with"""
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        leading = {list(index.columns)[0].name for index in table.indexes if index.columns}
+        leading |= {
+            list(constraint.columns)[0].name
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.columns
+        }
+        if table.primary_key.columns:
+            leading.add(list(table.primary_key.columns)[0].name)
+        for fk in table.foreign_keys:
+            column = fk.parent.name
+            if column not in leading and (table.name, column) not in UNINDEXED_FK_ALLOWED:
+                missing.append(f"{table.name}.{column} -> {fk.target_fullname}")
+    return missing
+
+
+Check = Callable[[AsyncSession], Awaitable[Any]]
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def _execute(statement) -> Check:
+    return lambda session: session.execute(statement)
+
+
+def _checks(s: Dict[str, Any]) -> List[Tuple[str, Check]]:
+    """(name, call) for each hot query path, with sample values from the seed"""
+    # One aggregation window (MAX_WINDOW), a month back
+    window_start = datetime.utcnow() - timedelta(days=30)
+    window_end = window_start + analytics_service.MAX_WINDOW
+    # A month of analytics: the dashboard's five-month default reads ~20% of two
+    # years of buckets, which a sequential scan can legitimately serve
+    until = date.today() + timedelta(days=1)
+    since = until - timedelta(days=30)
+    heatmap_cells, heatmap_outbreaks = analytics_service.heatmap_queries(until - timedelta(days=7), until)
+    disease_cells, disease_outbreaks = analytics_service.heatmap_queries(until - timedelta(days=7), until, "rust")
+    user_id = str(s["user_id"])
+
+    async def create_session(session):
+        await SessionStore.create(session, user_id)
+        await session.flush()
+
+    def uploads(**filters) -> Check:
+        query = admin.uploads_query(**filters)
+        return _execute(apply_keyset(query, PlantScan.created_at, PlantScan.id, None, 50))
+
+    return [
+        ("cart: get", lambda session: _get_cart_internal(session, s["user_id"])),
+        ("products: detail", lambda session: get_product(str(s["product_id"]), user_id, session)),
+        ("orders: list", _execute(orders.orders_page_query(user_id, None, 50))),
+        ("orders: detail", _execute(orders.order_query(str(s["order_id"]), user_id))),
+        ("orders: items", lambda session: orders.load_order_items(session, [s["order_id"]])),
+        ("admin: orders", _execute(apply_keyset(admin.orders_query(), Order.created_at, Order.id, None, 50))),
+        ("admin: orders by status", _execute(apply_keyset(admin.orders_query("placed"), Order.created_at, Order.id, None, 50))),
+        ("admin: uploads", uploads()),
+        ("admin: uploads by disease", uploads(disease="leaf blight")),
+        ("admin: uploads needing review", uploads(needs_review=True)),
+        ("admin: uploads by phone", uploads(phone=s["phone"])),
+        ("admin: uploads full", uploads(fields="full")),
+        ("plant: exact duplicate", _execute(plant.exact_duplicate_query(s["md5"]))),
+        ("plant: similar candidates", _execute(plant.similar_candidates_query())),
+        ("plant: scan result", _execute(plant.scan_result_query(s["scan_id"]))),
+        ("roles: load", lambda session: RoleService.load_roles(session, user_id)),
+        ("roles: grant", lambda session: RoleService.grant(session, user_id, "admin")),
+        ("sessions: resolve", _execute(resolve_query(s["token_hash"]))),
+        ("sessions: create", create_session),
+        ("aggregate: scan results", lambda session: analytics_service._aggregate_scan_results(session, window_start, window_end)),
+        ("aggregate: plant scans", lambda session: analytics_service._aggregate_plant_scans(session, window_start, window_end)),
+        ("aggregate: orders", lambda session: analytics_service._aggregate_orders(session, window_start, window_end)),
+        ("analytics: region-wise diseases", _execute(analytics_service.region_wise_diseases_query(since, until))),
+        ("analytics: product conversion", _execute(analytics_service.product_conversion_query(since, until))),
+        ("analytics: active farmers", _execute(analytics_service.monthly_active_farmers_query(since, until))),
+        ("analytics: monthly totals", _execute(analytics_service.monthly_totals_query(since, until))),
+        ("heatmap: cells", _execute(heatmap_cells)),
+        ("heatmap: outbreaks", _execute(heatmap_outbreaks)),
+        ("heatmap: cells by disease", _execute(disease_cells)),
+        ("heatmap: outbreaks by disease", _execute(disease_outbreaks)),
+    ]
+
+
+def seq_scans(plan: Dict[str, Any]) -> List[str]:
+    """Seeded tables read by a Seq Scan anywhere in an EXPLAIN (FORMAT JSON) plan"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in SEEDED_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def _explain(conn, statement: str, parameters) -> Dict[str, Any]:
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def _run_check(conn, check: Check) -> List[Dict[str, Any]]:
+    """
+    Run check on a session joined to the seeded transaction and EXPLAIN every
+    statement it sent, with the parameters it sent them with. Its writes are
+    rolled back afterwards.
+    """
+    sent = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        # Skips the session's SAVEPOINT / RELEASE bookkeeping
+        if not executemany and statement.lstrip().upper().startswith(_EXPLAINABLE):
+            sent.append((statement, parameters))
+
+    savepoint = await conn.begin_nested()
+    try:
+        session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint")
+        event.listen(conn.sync_connection, "before_cursor_execute", capture)
+        try:
+            await check(session)
+        finally:
+            event.remove(conn.sync_connection, "before_cursor_execute", capture)
+            await session.close()
+        return [await _explain(conn, statement, parameters) for statement, parameters in sent]
+    finally:
+        await savepoint.rollback()
+
+
+async def check_plans(scale: float = 1.0, log: Callable[[str], None] = print) -> List[str]:
+    """Seed, EXPLAIN every check and roll back. Returns the failures."""
+    counts = {key: max(1, int(value * scale)) if key in ("users", "products") else value for key, value in SEED.items()}
+    failures = []
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            if (await conn.execute(text("SELECT EXISTS (SELECT 1 FROM users)"))).scalar_one():
+                raise RuntimeError("users is not empty; run the plan check against a scratch database")
+            for statement in _SEED_SQL:
+                await conn.exec_driver_sql(statement.format(diseases=SEED_DISEASES, **counts))
+            for table in SEEDED_TABLES:
+                await conn.exec_driver_sql(f"ANALYZE {table}")
+
+            row = (await conn.execute(text("""
+                SELECT u.id AS user_id, u.phone, c.id AS cart_id, o.id AS order_id, p.id AS product_id,
+                       s.id AS scan_id, s.image_hash_md5 AS md5, us.token_hash
+                FROM users u
+                JOIN carts c ON c.user_id = u.id AND c.is_active
+                JOIN orders o ON o.user_id = u.id
+                JOIN plant_scans s ON s.user_id = u.id
+                JOIN user_sessions us ON us.user_id = u.id
+                CROSS JOIN LATERAL (SELECT id FROM products WHERE is_active LIMIT 1) p
+                LIMIT 1
+            """))).one()
+
+            for name, check in _checks(dict(row._mapping)):
+                try:
+                    plans = await _run_check(conn, check)
+                except Exception as exc:
+                    failures.append(f"{name}: {exc}")
+                    log(f"FAIL {name}")
+                    continue
+                tables = [table for plan in plans for table in seq_scans(plan)]
+                if tables:
+                    failures.append(f"{name}: sequential scan on {', '.join(sorted(set(tables)))}")
+                log(f"{'FAIL' if tables else 'ok  '} {name} ({len(plans)} statements)")
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail when hot queries fall back to sequential scans")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier for the seeded user and product counts")
+    args = parser.parse_args()
+
+    failures = [f"unindexed foreign key: {fk}" for fk in unindexed_foreign_keys()]
+    failures += asyncio.run(check_plans(args.scale))
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Connection pool gauges. InstrumentedQueuePool times every checkout so the
+wait for a free connection (normally invisible request latency) can be
+reported alongside the pool's size, checked-out and overflow counts.
+"""
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+RECENT_WAITS = 1000
+
+
+class PoolMetrics:
+    """Checkout wait statistics, cumulative and over the last RECENT_WAITS checkouts"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self._recent: Deque[float] = deque(maxlen=RECENT_WAITS)
+
+    def record_wait(self, wait_ms: float) -> None:
+        self.checkouts += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self._recent.append(wait_ms)
+
+    def _percentile(self, fraction: float) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)], 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "recent_p50_wait_ms": self._percentile(0.50),
+            "recent_p95_wait_ms": self._percentile(0.95),
+            "recent_p99_wait_ms": self._percentile(0.99),
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long each checkout waited, per pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        self.metrics.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+
+def pool_status(pool) -> Dict[str, Any]:
+    """Live gauges for an engine's pool"""
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "timeout_seconds": pool.timeout(),
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        status.update(pool.metrics.snapshot())
+    return status
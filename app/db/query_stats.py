@@ -0,0 +1,197 @@
+"""
+Statement instrumentation.
+
+Per request: QueryBudgetMiddleware puts a QueryStats in query_stats_ctx;
+engine hooks add every statement executed while it is set (any session,
+same request) to it, grouped by statement fingerprint.
+
+Per process: when the request ends its statements are merged into
+statement_stats under the route ("GET /orders/{order_id}"), keeping count,
+total/max time, rows and the request id of the slowest run. Statements
+outside a request (background workers) are recorded under "background".
+Statements slower than SLOW_QUERY_THRESHOLD_MS are logged as they finish.
+"""
+import logging
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BACKGROUND_ROUTE = "background"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """
+    Statement with literals and parameters replaced by ?, IN lists and
+    multi-row VALUES collapsed, and whitespace normalized, so calls that
+    differ only in their values share one entry
+    """
+    statement = _STRING.sub("?", statement)
+    statement = _PARAM.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _LIST.sub("(...)", statement)
+    statement = _ROWS.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class StatementStats:
+    """Totals for one statement fingerprint"""
+
+    __slots__ = ("count", "total_ms", "max_ms", "rows", "slowest_request_id")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.slowest_request_id: Optional[str] = None
+
+    def add(self, count: int, total_ms: float, max_ms: float, rows: int, request_id: Optional[str]) -> None:
+        self.count += count
+        self.total_ms += total_ms
+        self.rows += rows
+        if max_ms >= self.max_ms:
+            self.max_ms = max_ms
+            self.slowest_request_id = request_id
+
+
+class QueryStats:
+    """Statements executed during one request"""
+
+    __slots__ = ("statements", "elapsed_ms", "request_id", "request_line", "by_statement")
+
+    def __init__(self, request_id: Optional[str] = None, request_line: Optional[str] = None):
+        self.statements = 0
+        self.elapsed_ms = 0.0
+        self.request_id = request_id
+        self.request_line = request_line  # "GET /orders/<id>", for slow-query logs
+        self.by_statement: Dict[str, StatementStats] = {}
+
+    def record(self, statement: str, elapsed_ms: float, rows: int) -> None:
+        self.statements += 1
+        self.elapsed_ms += elapsed_ms
+        entry = self.by_statement.get(statement)
+        if entry is None:
+            entry = self.by_statement[statement] = StatementStats()
+        entry.add(1, elapsed_ms, elapsed_ms, rows, self.request_id)
+
+
+class StatementRegistry:
+    """
+    Process-wide totals per (route, fingerprint). Fingerprints are a small,
+    fixed set in practice; past max_entries new ones are counted as dropped.
+    """
+
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self.dropped = 0
+        self._entries: Dict[Tuple[str, str], StatementStats] = {}
+
+    def _entry(self, route: str, statement: str) -> Optional[StatementStats]:
+        key = (route, statement)
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.max_entries:
+                self.dropped += 1
+                return None
+            entry = self._entries[key] = StatementStats()
+        return entry
+
+    def record(self, route: str, statement: str, elapsed_ms: float, rows: int, request_id: Optional[str] = None) -> None:
+        entry = self._entry(route, statement)
+        if entry is not None:
+            entry.add(1, elapsed_ms, elapsed_ms, rows, request_id)
+
+    def merge(self, route: str, stats: QueryStats) -> None:
+        """Fold one request's statements into the totals"""
+        for statement, request_entry in stats.by_statement.items():
+            entry = self._entry(route, statement)
+            if entry is not None:
+                entry.add(
+                    request_entry.count, request_entry.total_ms, request_entry.max_ms,
+                    request_entry.rows, request_entry.slowest_request_id
+                )
+
+    def top(self, limit: int = 20, order_by: str = "total_ms", route: Optional[str] = None) -> List[Dict[str, Any]]:
+        entries = [
+            (key, entry) for key, entry in self._entries.items()
+            if route is None or key[0] == route
+        ]
+        entries.sort(key=lambda item: getattr(item[1], order_by), reverse=True)
+        return [
+            {
+                "route": entry_route,
+                "statement": statement,
+                "count": entry.count,
+                "total_ms": round(entry.total_ms, 3),
+                "avg_ms": round(entry.total_ms / entry.count, 3),
+                "max_ms": round(entry.max_ms, 3),
+                "rows": entry.rows,
+                "slowest_request_id": entry.slowest_request_id,
+            }
+            for (entry_route, statement), entry in entries[:limit]
+        ]
+
+    def reset(self) -> None:
+        self._entries.clear()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+query_stats_ctx: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+statement_stats = StatementRegistry(max_entries=settings.STATEMENT_STATS_MAX_ENTRIES)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context, so a failed statement leaves nothing behind
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_started) * 1000
+    rows = max(cursor.rowcount, 0)
+    statement = fingerprint(statement)
+
+    stats = query_stats_ctx.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms, rows)
+    else:
+        statement_stats.record(BACKGROUND_ROUTE, statement, elapsed_ms, rows)
+
+    if elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+        # Parameter values are left out: they can hold phone numbers and tokens.
+        # JsonFormatter adds the request id.
+        logger.warning(
+            f"Slow query ({elapsed_ms:.1f} ms)",
+            extra={"fields": {
+                "event": "slow_query",
+                "duration_ms": round(elapsed_ms, 3),
+                "rows": rows,
+                "statement": statement[:2000],
+                "request": stats.request_line if stats is not None else BACKGROUND_ROUTE,
+            }}
+        )
+
+
+def install(engine: Engine) -> None:
+    """Register the statement hooks on a (sync) engine"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
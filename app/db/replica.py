@@ -0,0 +1,149 @@
+"""
+Read-replica routing. Read-only endpoints take their session from
+read_session()/get_read_session, which use the replica when
+DATABASE_REPLICA_URL is set and fall back to the primary when:
+
+- the replica's replay lag exceeds REPLICA_MAX_LAG_SECONDS (or it can't be
+  reached, or isn't streaming from the primary and has nothing to measure
+  by), checked at most every REPLICA_LAG_CHECK_INTERVAL_SECONDS; or
+- the requesting user made a write in the last READ_YOUR_WRITES_SECONDS,
+  so they never read data older than their own change.
+
+Stickiness is tracked per worker (a user's follow-up read may land on
+another worker); the lag bound limits what that can miss.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.db import query_stats
+from app.db.session import async_session, engine_options
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+replica_engine = None
+replica_session = None
+if settings.database_replica_url:
+    replica_engine = create_async_engine(
+        settings.database_replica_url,
+        echo=False,
+        future=True,
+        **engine_options(),
+    )
+    replica_session = sessionmaker(
+        replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+    query_stats.install(replica_engine.sync_engine)
+
+# user_id -> True while the user's reads must go to the primary
+_recent_writers = TTLCache(ttl_seconds=settings.READ_YOUR_WRITES_SECONDS, max_entries=100000)
+
+# Lag in seconds, or NULL when it can't be told (treated as unusable)
+_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        -- Nothing left to replay while still streaming means caught up, however
+        -- old the last transaction is. A disconnected receiver stops advancing
+        -- receive_lsn too, so without 'streaming' equal LSNs prove nothing.
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+            AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+class _ReplicaHealth:
+    def __init__(self):
+        self.lag_seconds: Optional[float] = None
+        self.healthy = False
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def is_usable(self) -> bool:
+        if time.monotonic() - self.checked_at < settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS:
+            return self.healthy
+        async with self._lock:
+            # Another request may have refreshed it while we waited
+            if time.monotonic() - self.checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS:
+                await self._check()
+        return self.healthy
+
+    async def _check(self) -> None:
+        try:
+            async with replica_session() as session:
+                lag = (await session.execute(_LAG_QUERY)).scalar_one()
+            self.lag_seconds = float(lag) if lag is not None else None
+            healthy = self.lag_seconds is not None and self.lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+        except Exception as e:
+            logger.warning(f"Replica check failed, reading from primary: {e}")
+            self.lag_seconds = None
+            healthy = False
+        if healthy != self.healthy:
+            logger.info(f"Replica {'in use' if healthy else 'bypassed'} (lag: {self.lag_seconds})")
+        self.healthy = healthy
+        self.checked_at = time.monotonic()
+
+
+replica_health = _ReplicaHealth()
+
+
+def mark_write(user_id: str) -> None:
+    """Route user_id's reads to the primary for READ_YOUR_WRITES_SECONDS"""
+    _recent_writers.set(user_id, True)
+
+
+async def use_replica(user_id: Optional[str] = None) -> bool:
+    if replica_session is None:
+        return False
+    if user_id and _recent_writers.get(user_id):
+        return False
+    return await replica_health.is_usable()
+
+
+@asynccontextmanager
+async def read_session(user_id: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+    """Session for read-only work: the replica when usable, else the primary"""
+    factory = replica_session if await use_replica(user_id) else async_session
+    async with factory() as session:
+        yield session
+
+
+def request_user_id(request: Request) -> Optional[str]:
+    """User id from the request's bearer token, if it carries a valid one"""
+    authorization = request.headers.get("Authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return None
+    from app.core.security import decode_access_token
+    try:
+        return decode_access_token(authorization[7:]).get("sub")
+    except Exception:
+        return None
+
+
+async def get_read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    Request-scoped read-only session. Usage:
+    session: AsyncSession = Depends(get_read_session)
+    """
+    async with read_session(request_user_id(request)) as session:
+        session.info["query_stats"] = query_stats.query_stats_ctx.get()
+        yield session
+
+
+def replica_status() -> dict:
+    return {
+        "configured": replica_session is not None,
+        "in_use": replica_health.healthy,
+        "lag_seconds": replica_health.lag_seconds,
+        "max_lag_seconds": settings.REPLICA_MAX_LAG_SECONDS,
+    }
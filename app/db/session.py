@@ -1,3 +1,6 @@
+from typing import AsyncIterator
+from uuid import uuid4
+
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     create_async_engine,
@@ -5,13 +8,44 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import get_settings
+from app.db import query_stats
+from app.db.pool_metrics import InstrumentedQueuePool
 
 settings = get_settings()
 
+
+
+def engine_options() -> dict:
+    """Pool and driver options from Settings"""
+    if settings.DB_PGBOUNCER:
+        # Transaction pooling hands each transaction a different server
+        # connection, so prepared statements can't be cached or reused by name
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    else:
+        connect_args = {
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
 engine = create_async_engine(
     settings.database_url,
     echo=False,
     future=True,
+    **engine_options(),
 )
 
 async_session = sessionmaker(
@@ -19,3 +53,19 @@ async_session = sessionmaker(
     class_=AsyncSession,
     expire_on_commit=False,
 )
+
+query_stats.install(engine.sync_engine)
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """
+    One session per request. Usage:
+    session: AsyncSession = Depends(get_session)
+
+    Handlers and the helpers they call share it and commit explicitly;
+    anything uncommitted is rolled back when the request ends. The
+    request's QueryStats is available as session.info["query_stats"].
+    """
+    async with async_session() as session:
+        session.info["query_stats"] = query_stats.query_stats_ctx.get()
+        yield session
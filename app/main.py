@@ -2,20 +2,20 @@ from fastapi import FastAPI, HTTPException, Depends, status, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
-from datetime import datetime, timedelta
 from uuid import uuid4, UUID
-from collections import defaultdict
 import logging
-from twilio.rest import Client
 from app.db.session import async_session
 from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.core.logging import setup_logging
 from app.core.request_id import RequestIDMiddleware
+from app.core.query_budget import QueryBudgetMiddleware
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.read_your_writes import ReadYourWritesMiddleware
 from app.core.config import get_settings
 from app.core.security import create_access_token, decode_access_token, get_current_user_id
 from app.db.models.users import User
-from app.db.models.user_sessions import UserSession
 from app.routers.plant import router as plant_router
 from app.routers.products import router as products_router
 from app.routers.cart import router as cart_router
@@ -23,6 +23,14 @@ from app.routers.orders import router as orders_router
 from app.routers.admin import router as admin_router
 from app.db.session import engine
 from app.db.base import Base
+from app.services.outbox_dispatcher import outbox_dispatcher
+from app.services.order_stream import order_stream_hub
+from app.services.analytics_service import analytics_aggregator
+from app.services.role_service import RoleService
+from app.services.otp_provider import otp_provider, OtpError
+from app.services.rate_limiter import rate_limiter, OTP_RATE
+from app.services.session_store import SessionStore, session_sweeper
+from app.services.idempotency_service import idempotency_sweeper
 
 # --- SETTINGS & LOGGER ---
 settings = get_settings()
@@ -30,29 +38,24 @@ setup_logging("INFO")
 logger = logging.getLogger(__name__)
 logger.info("Starting AgriCure backend")
 
-# --- TWILIO CLIENT ---
-client = Client(settings.TWILIO_SID, settings.TWILIO_AUTH_TOKEN)
-
 # --- APP INIT ---
 app = FastAPI(title=settings.APP_NAME)
 
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryBudgetMiddleware)
 app.add_middleware(RequestIDMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # tighten in PROD
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # browsers hide other response headers from scripts
 )
 app.include_router(plant_router)
 app.include_router(products_router)
 app.include_router(cart_router)
 app.include_router(orders_router)
 app.include_router(admin_router) 
-# --- RATE LIMIT STORAGE (in-memory, replace with Redis for prod) ---
-otp_request_counts = defaultdict(list)
-OTP_LIMIT = 3  # Max 3 requests per hour
-OTP_WINDOW = timedelta(hours=1)
-
 # --- REQUEST MODELS ---
 class MobileNumberRequest(BaseModel):
     mobileNumber: str
@@ -66,6 +69,36 @@ class RefreshTokenRequest(BaseModel):
 
 # --- OTP / AUTH ROUTES ---
 
+async def _login(session, mobile: str, name: str | None = None):
+    """
+    Upsert the user (reactivating them), open a refresh session and mint an
+    access token: one INSERT ... ON CONFLICT ... RETURNING plus the session
+    insert, committed once.
+
+    Returns:
+        Tuple of (user, refresh_token, access_token)
+    """
+    stmt = (
+        pg_insert(User)
+        .values(id=uuid4(), phone=mobile, name=name, language="en", is_active=True)
+        .on_conflict_do_update(index_elements=[User.phone], set_={"is_active": True})
+        .returning(User)
+    )
+    result = await session.execute(
+        select(User).from_statement(stmt).execution_options(populate_existing=True)
+    )
+    user: User = result.scalar_one()
+
+    # Create refresh token (oldest sessions beyond the per-user cap are dropped)
+    refresh_token = await SessionStore.create(session, user.id)
+
+    # Access token carries the user's roles
+    roles = await RoleService.load_roles(session, user.id)
+    await session.commit()
+    access_token = create_access_token(subject=user.id, roles=roles)
+    return user, refresh_token, access_token
+
+
 @app.post("/auth/admin-login")
 async def admin_login(request: MobileNumberRequest):
     """
@@ -81,32 +114,7 @@ async def admin_login(request: MobileNumberRequest):
         raise HTTPException(status_code=403, detail="Not an admin user")
     
     async with async_session() as session:
-        # Upsert user
-        result = await session.execute(select(User).where(User.phone == mobile))
-        user: User | None = result.scalar_one_or_none()
-
-        if not user:
-            user = User(phone=mobile, name="Admin")
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
-        elif not user.is_active:
-            user.is_active = True
-            await session.commit()
-
-        # Create refresh token
-        refresh_token = str(uuid4())
-        expires_at = datetime.utcnow() + timedelta(days=7)
-        user_session = UserSession(
-            user_id=user.id,
-            token=refresh_token,
-            expires_at=expires_at
-        )
-        session.add(user_session)
-        await session.commit()
-
-        # Generate access token
-        access_token = create_access_token(subject=user.id)
+        user, refresh_token, access_token = await _login(session, mobile, name="Admin")
 
     return {
         "access_token": access_token,
@@ -126,19 +134,12 @@ async def request_otp(request: MobileNumberRequest):
     if len(mobile) != 10 or not mobile.isdigit():
         raise HTTPException(status_code=400, detail="Invalid mobile number")
 
-    # Rate limit
-    now = datetime.utcnow()
-    otp_request_counts[mobile] = [ts for ts in otp_request_counts[mobile] if now - ts < OTP_WINDOW]
-    if len(otp_request_counts[mobile]) >= OTP_LIMIT:
-        raise HTTPException(status_code=429, detail="Too many OTP requests. Try later.")
-    otp_request_counts[mobile].append(now)
+    # Rate limit (shared across workers)
+    await rate_limiter.check(f"otp:{mobile}", OTP_RATE, detail="Too many OTP requests. Try later.")
 
     try:
-        client.verify.v2.services(settings.TWILIO_VERIFY_SERVICE_SID).verifications.create(
-            to=f"+91{mobile}",
-            channel="sms"
-        )
-    except Exception as e:
+        await otp_provider.send(f"+91{mobile}")
+    except OtpError as e:
         raise HTTPException(status_code=500, detail=f"Failed to send OTP: {str(e)}")
 
     return {"success": True, "message": f"OTP sent to {mobile}"}
@@ -149,44 +150,15 @@ async def verify_otp(request: OTPRequest):
     mobile = request.mobileNumber
     otp_input = request.otp
 
-    # Twilio verification
     try:
-        verification_check = client.verify.v2.services(settings.TWILIO_VERIFY_SERVICE_SID).verification_checks.create(
-            to=f"+91{mobile}",
-            code=otp_input
-        )
-        if verification_check.status != "approved":
-            raise HTTPException(status_code=400, detail="Invalid OTP")
-    except Exception as e:
+        approved = await otp_provider.verify(f"+91{mobile}", otp_input)
+    except OtpError as e:
         raise HTTPException(status_code=500, detail=f"Verification failed: {str(e)}")
+    if not approved:
+        raise HTTPException(status_code=400, detail="Invalid OTP")
 
     async with async_session() as session:
-        # Upsert user
-        result = await session.execute(select(User).where(User.phone == mobile))
-        user: User | None = result.scalar_one_or_none()
-
-        if not user:
-            user = User(phone=mobile)
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
-        elif not user.is_active:
-            user.is_active = True
-            await session.commit()
-
-        # Create refresh token
-        refresh_token = str(uuid4())
-        expires_at = datetime.utcnow() + timedelta(days=7)
-        user_session = UserSession(
-            user_id=user.id,
-            token=refresh_token,
-            expires_at=expires_at
-        )
-        session.add(user_session)
-        await session.commit()
-
-        # Generate access token
-        access_token = create_access_token(subject=user.id)
+        user, refresh_token, access_token = await _login(session, mobile)
 
     return {
         "access_token": access_token,
@@ -202,28 +174,21 @@ async def verify_otp(request: OTPRequest):
 
 @app.post("/auth/refresh")
 async def refresh_token(request: RefreshTokenRequest):
-    async with async_session() as session:
-        result = await session.execute(
-            select(UserSession).where(UserSession.token == request.refresh_token)
-        )
-        session_obj: UserSession | None = result.scalar_one_or_none()
-        if not session_obj or session_obj.expires_at < datetime.utcnow():
-            raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    # Repeated refreshes are served from the session and role caches
+    user_id = await SessionStore.resolve(request.refresh_token)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
 
-        # Generate new access token
-        access_token = create_access_token(subject=session_obj.user_id)
-        return {"access_token": access_token, "token_type": "bearer"}
+    # Generate new access token with current roles
+    roles = await RoleService.get_roles(user_id)
+    access_token = create_access_token(subject=user_id, roles=roles)
+    return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/auth/logout")
 async def logout(request: RefreshTokenRequest):
     async with async_session() as session:
-        result = await session.execute(
-            select(UserSession).where(UserSession.token == request.refresh_token)
-        )
-        session_obj: UserSession | None = result.scalar_one_or_none()
-        if session_obj:
-            await session.delete(session_obj)
-            await session.commit()
+        await SessionStore.revoke(session, request.refresh_token)
+        await session.commit()
     return {"success": True, "message": "Logged out successfully"}
 
 class UpdateUserRequest(BaseModel):
@@ -269,6 +234,24 @@ async def startup():
     else:
         logger.info("API started (production mode - using Alembic migrations)")
 
+    if settings.OUTBOX_DISPATCHER_ENABLED:
+        outbox_dispatcher.start()
+        logger.info("Outbox dispatcher started")
+    if settings.ORDER_STREAM_ENABLED:
+        order_stream_hub.start()
+    if settings.ANALYTICS_AGGREGATOR_ENABLED:
+        analytics_aggregator.start()
+    if settings.SESSION_SWEEPER_ENABLED:
+        session_sweeper.start()
+    if settings.IDEMPOTENCY_SWEEPER_ENABLED:
+        idempotency_sweeper.start()
+
 @app.on_event("shutdown")
 async def shutdown():
+    await outbox_dispatcher.stop()
+    await order_stream_hub.stop()
+    await analytics_aggregator.stop()
+    await session_sweeper.stop()
+    await idempotency_sweeper.stop()
+    await otp_provider.close()
     logger.info("API shutdown")
@@ -1,17 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
 from sqlalchemy.future import select
 from sqlalchemy import func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import async_session
+from app.db.replica import read_session, get_read_session
 from app.db.models.users import User
 from app.db.models.plant_scans import PlantScan
-from app.db.models.orders import Order
+from app.db.models.orders import Order, ORDER_STATUSES
 from app.db.models.products import Product
-from app.db.models.user_roles import UserRole
-from app.core.security import get_current_user_id
+from app.core.security import require_role
+from app.core.pagination import apply_keyset, paginate
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import List, Optional, Literal
+from datetime import date, datetime, timedelta
 from uuid import UUID
+import asyncio
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -29,20 +32,14 @@ class AdminLoginResponse(BaseModel):
 class DashboardStatsResponse(BaseModel):
     total_uploads: int
     total_orders: int
+    total_revenue: float = 0.0
     total_calls: int
     top_diseases: List[dict]
 
 
-# Simple admin check - in production, use proper role-based access
-async def get_admin_user(user_id: str = Depends(get_current_user_id)):
-    async with async_session() as session:
-        result = await session.execute(
-            select(UserRole).where(UserRole.user_id == UUID(user_id), UserRole.role == "admin")
-        )
-        role = result.scalar_one_or_none()
-        if not role:
-            raise HTTPException(status_code=403, detail="Admin access required")
-        return user_id
+# Authorized from the token's roles claim; the role cache (not the database)
+# confirms the role hasn't been revoked since the token was issued
+get_admin_user = require_role("admin", fresh=True)
 
 
 @router.post("/login", response_model=AdminLoginResponse)
@@ -61,17 +58,13 @@ async def admin_login(request: AdminLoginRequest):
                 await session.refresh(admin_user)
             
             # Create admin role if not exists
-            role_result = await session.execute(
-                select(UserRole).where(UserRole.user_id == admin_user.id, UserRole.role == "admin")
-            )
-            role = role_result.scalar_one_or_none()
-            if not role:
-                role = UserRole(user_id=admin_user.id, role="admin")
-                session.add(role)
+            from app.services.role_service import RoleService
+            if await RoleService.grant(session, admin_user.id, "admin"):
                 await session.commit()
-            
+            roles = await RoleService.load_roles(session, admin_user.id)
+
             from app.core.security import create_access_token
-            access_token = create_access_token(subject=str(admin_user.id))
+            access_token = create_access_token(subject=str(admin_user.id), roles=roles)
             
             return {
                 "access_token": access_token,
@@ -100,143 +93,273 @@ async def get_admin_info(user_id: str = Depends(get_admin_user)):
         }
 
 
+async def _dashboard_totals():
+    from app.db.models.daily_stats import DailyStat
+    async with read_session() as session:
+        result = await session.execute(
+            select(
+                func.coalesce(func.sum(DailyStat.scans), 0),
+                func.coalesce(func.sum(DailyStat.orders), 0),
+                func.coalesce(func.sum(DailyStat.revenue), 0)
+            )
+        )
+        return result.one()
+
+
+async def _dashboard_top_diseases(limit: int = 10):
+    from app.db.models.daily_disease_counts import DailyDiseaseCount
+    async with read_session() as session:
+        total = func.sum(DailyDiseaseCount.count).label("total")
+        result = await session.execute(
+            select(DailyDiseaseCount.disease_name, total)
+            .group_by(DailyDiseaseCount.disease_name)
+            .order_by(desc(total))
+            .limit(limit)
+        )
+        return [{"name": name, "count": int(count)} for name, count in result.all()]
+
+
 @router.get("/dashboard/stats", response_model=DashboardStatsResponse)
 async def get_dashboard_stats(user_id: str = Depends(get_admin_user)):
-    async with async_session() as session:
-        # Total uploads
-        uploads_result = await session.execute(select(func.count(PlantScan.id)))
-        total_uploads = uploads_result.scalar() or 0
-        
-        # Total orders
-        orders_result = await session.execute(select(func.count(Order.id)))
-        total_orders = orders_result.scalar() or 0
-        
-        # Total calls (placeholder - would need a support_calls table)
-        total_calls = 0
-        
-        # Top diseases
-        from app.db.models.scan_results import ScanResult
-        scans_result = await session.execute(
-            select(ScanResult.result_json)
-            .join(PlantScan, ScanResult.scan_id == PlantScan.id)
-            .limit(100)
-        )
-        scans = scans_result.scalars().all()
-        
-        disease_counts = {}
-        for scan_json in scans:
-            if scan_json:
-                import json
-                if isinstance(scan_json, str):
-                    try:
-                        scan = json.loads(scan_json)
-                    except:
-                        continue
-                else:
-                    scan = scan_json
-                
-                if isinstance(scan, dict):
-                    disease_name = scan.get("disease_name") or (scan.get("detections", [{}])[0].get("label") if scan.get("detections") else None) or "Unknown"
-                    if disease_name and disease_name != "Unknown":
-                        disease_counts[disease_name] = disease_counts.get(disease_name, 0) + 1
-        
-        top_diseases = [
-            {"name": name, "count": count}
-            for name, count in sorted(disease_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        ]
-        
-        return {
-            "total_uploads": total_uploads,
-            "total_orders": total_orders,
-            "total_calls": total_calls,
-            "top_diseases": top_diseases
-        }
+    # Read from the daily rollups (see RollupService); independent queries run concurrently
+    (total_uploads, total_orders, total_revenue), top_diseases = await asyncio.gather(
+        _dashboard_totals(),
+        _dashboard_top_diseases()
+    )
+    
+    # Total calls (placeholder - would need a support_calls table)
+    total_calls = 0
+    
+    return {
+        "total_uploads": int(total_uploads),
+        "total_orders": int(total_orders),
+        "total_revenue": float(total_revenue),
+        "total_calls": total_calls,
+        "top_diseases": top_diseases
+    }
 
 
-@router.get("/uploads")
-async def get_all_uploads(user_id: str = Depends(get_admin_user)):
+def uploads_query(
+    fields: str = "summary",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    disease: Optional[str] = None,
+    needs_review: Optional[bool] = None,
+    is_duplicate: Optional[bool] = None,
+    phone: Optional[str] = None
+):
+    """Filtered scans for /admin/uploads, before paging"""
     from app.db.models.scan_results import ScanResult
-    async with async_session() as session:
+    columns = [
+        PlantScan.id,
+        PlantScan.user_id,
+        PlantScan.image_filename,
+        PlantScan.is_duplicate,
+        PlantScan.created_at,
+        User.phone,
+        ScanResult.id.label("result_id"),
+        ScanResult.disease_name,
+        ScanResult.consensus_confidence,
+        ScanResult.needs_review,
+    ]
+    if fields == "full":
+        columns.append(ScanResult.result_json)
+
+    query = (
+        select(*columns)
+        .join(User, PlantScan.user_id == User.id)
+        .outerjoin(ScanResult, ScanResult.scan_id == PlantScan.id)
+    )
+    if created_from:
+        query = query.where(PlantScan.created_at >= created_from)
+    if created_to:
+        query = query.where(PlantScan.created_at < created_to)
+    if disease:
+        from app.services.rollup_service import normalize_disease_value
+        query = query.where(ScanResult.disease_name == normalize_disease_value(disease))
+    if needs_review is not None:
+        # Plain "needs_review" matches the partial index ix_scan_results_needs_review
+        query = query.where(ScanResult.needs_review if needs_review else ScanResult.needs_review.is_(False))
+    if is_duplicate is not None:
+        query = query.where(PlantScan.is_duplicate.is_(is_duplicate))
+    if phone:
+        query = query.where(User.phone == phone)
+
+    return query
+
+
+@router.get("/uploads")
+async def get_all_uploads(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    disease: Optional[str] = None,
+    needs_review: Optional[bool] = None,
+    is_duplicate: Optional[bool] = None,
+    phone: Optional[str] = None,
+    fields: Literal["summary", "full"] = "summary",
+    user_id: str = Depends(get_admin_user)
+):
+    """
+    Scans newest first, one page at a time (next page cursor in X-Next-Cursor).
+    fields=summary returns disease/confidence/review flags; fields=full adds the complete result JSON.
+    """
+    query = uploads_query(fields, created_from, created_to, disease, needs_review, is_duplicate, phone)
+    async with read_session(user_id) as session:
         result = await session.execute(
-            select(PlantScan, User.phone, ScanResult)
-            .join(User, PlantScan.user_id == User.id)
-            .outerjoin(ScanResult, ScanResult.scan_id == PlantScan.id)
-            .order_by(desc(PlantScan.created_at))
+            apply_keyset(query, PlantScan.created_at, PlantScan.id, cursor, limit)
         )
-        scans = result.all()
+        rows = paginate(response, result.all(), limit)
+    
+    uploads = []
+    for row in rows:
+        if fields == "full":
+            result_data = row.result_json or {}
+        else:
+            result_data = {
+                "disease_name": row.disease_name,
+                "consensus_confidence": row.consensus_confidence,
+                "needs_review": row.needs_review
+            } if row.result_id else {}
         
-        uploads = []
-        for scan, phone, scan_result in scans:
-            result_data = {}
-            if scan_result and scan_result.result_json:
-                import json
-                if isinstance(scan_result.result_json, str):
-                    try:
-                        result_data = json.loads(scan_result.result_json)
-                    except:
-                        result_data = {"raw": scan_result.result_json}
-                else:
-                    result_data = scan_result.result_json
-            
-            # Construct image URL (assuming images are stored in a static directory)
-            image_url = f"/uploads/{scan.image_filename}" if scan.image_filename else ""
-            
-            uploads.append({
-                "id": str(scan.id),
-                "user_id": str(scan.user_id),
-                "user_phone": phone or "Unknown",
-                "image_url": image_url,
-                "status": "completed" if scan_result else "pending",
-                "result": result_data,
-                "created_at": scan.created_at.isoformat() if scan.created_at else datetime.utcnow().isoformat()
-            })
+        # Construct image URL (assuming images are stored in a static directory)
+        image_url = f"/uploads/{row.image_filename}" if row.image_filename else ""
         
-        return uploads
+        uploads.append({
+            "id": str(row.id),
+            "user_id": str(row.user_id),
+            "user_phone": row.phone or "Unknown",
+            "image_url": image_url,
+            "status": "completed" if row.result_id else "pending",
+            "is_duplicate": bool(row.is_duplicate),
+            "result": result_data,
+            "created_at": row.created_at.isoformat() if row.created_at else datetime.utcnow().isoformat()
+        })
+    
+    return uploads
+
+
+@router.get("/export/scans")
+async def export_scans(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: str = Depends(get_admin_user)
+):
+    """Stream every scan (with its summarized result) as CSV or NDJSON"""
+    from app.db.models.scan_results import ScanResult
+    from app.services.export_service import export_response
+    query = (
+        select(
+            PlantScan.id,
+            PlantScan.user_id,
+            User.phone,
+            PlantScan.created_at,
+            PlantScan.is_duplicate,
+            PlantScan.original_scan_id,
+            ScanResult.disease_name,
+            ScanResult.consensus_confidence,
+            ScanResult.needs_review
+        )
+        .join(User, PlantScan.user_id == User.id)
+        .outerjoin(ScanResult, ScanResult.scan_id == PlantScan.id)
+        .order_by(PlantScan.created_at, PlantScan.id)
+    )
+    if created_from:
+        query = query.where(PlantScan.created_at >= created_from)
+    if created_to:
+        query = query.where(PlantScan.created_at < created_to)
+
+    columns = [
+        "scan_id", "user_id", "user_phone", "created_at", "is_duplicate",
+        "original_scan_id", "disease_name", "consensus_confidence", "needs_review"
+    ]
+    return export_response(query, columns, "scans", format, gzip)
+
+
+@router.get("/export/orders")
+async def export_orders(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: str = Depends(get_admin_user)
+):
+    """Stream every order as CSV or NDJSON"""
+    from app.services.export_service import export_response
+    query = (
+        select(
+            Order.id,
+            Order.user_id,
+            Order.status,
+            Order.total_amount,
+            Order.address,
+            Order.created_at
+        )
+        .order_by(Order.created_at, Order.id)
+    )
+    if created_from:
+        query = query.where(Order.created_at >= created_from)
+    if created_to:
+        query = query.where(Order.created_at < created_to)
+
+    columns = ["order_id", "user_id", "status", "total_amount", "address", "created_at"]
+    return export_response(query, columns, "orders", format, gzip)
 
 
 @router.get("/products")
-async def get_all_products(user_id: str = Depends(get_admin_user)):
-    async with async_session() as session:
-        result = await session.execute(select(Product))
-        products = result.scalars().all()
-        
-        from app.routers.products import ProductResponse
-        from app.db.models.product_images import ProductImage
-        from app.db.models.product_inventory import ProductInventory
-        
-        response = []
-        for product in products:
-            # Get images
-            images_result = await session.execute(
-                select(ProductImage).where(ProductImage.product_id == product.id)
-            )
-            images = [img.image_url for img in images_result.scalars().all()]
-            
-            # Get inventory
-            inventory_result = await session.execute(
-                select(ProductInventory).where(ProductInventory.product_id == product.id)
-            )
-            inventory = inventory_result.scalar_one_or_none()
-            stock_quantity = inventory.quantity if inventory else 0
-            
-            response.append({
-                "id": str(product.id),
-                "name": product.name,
-                "description": product.description,
-                "price": float(product.price),
-                "is_active": product.is_active,
-                "images": images,
-                "stock_quantity": stock_quantity,
-                "unit": None
-            })
-        
-        return response
+async def get_all_products(
+    user_id: str = Depends(get_admin_user),
+    session: AsyncSession = Depends(get_read_session)
+):
+    from app.db.models.product_images import ProductImage
+    from app.db.models.product_inventory import ProductInventory
+
+    result = await session.execute(select(Product))
+    products = result.scalars().all()
+    if not products:
+        return []
+
+    # Images and stock for all products in two queries, not two per product
+    product_ids = [product.id for product in products]
+    inventory_result = await session.execute(
+        select(ProductInventory.product_id, ProductInventory.quantity)
+        .where(ProductInventory.product_id.in_(product_ids))
+    )
+    inventory_map = dict(inventory_result.all())
+
+    images_result = await session.execute(
+        select(ProductImage.product_id, ProductImage.image_url)
+        .where(ProductImage.product_id.in_(product_ids))
+    )
+    images_map: dict = {}
+    for product_id, image_url in images_result.all():
+        images_map.setdefault(product_id, []).append(image_url)
+
+    return [
+        {
+            "id": str(product.id),
+            "sku": product.sku,
+            "name": product.name,
+            "description": product.description,
+            "price": float(product.price),
+            "is_active": product.is_active,
+            "images": images_map.get(product.id, []),
+            "stock_quantity": inventory_map.get(product.id, 0),
+            "unit": None
+        }
+        for product in products
+    ]
 
 
 @router.post("/products")
 async def create_product(product_data: dict, user_id: str = Depends(get_admin_user)):
     async with async_session() as session:
         product = Product(
+            sku=product_data.get("sku"),
             name=product_data["name"],
             description=product_data.get("description"),
             price=product_data["price"],
@@ -258,6 +381,26 @@ async def create_product(product_data: dict, user_id: str = Depends(get_admin_us
         return {"id": str(product.id), "message": "Product created successfully"}
 
 
+@router.post("/products/import")
+async def import_products(file: UploadFile = File(...), user_id: str = Depends(get_admin_user)):
+    """
+    Bulk create/update products from a CSV with columns
+    sku, name, price and optional description, stock_quantity, is_active,
+    image_urls ("|"-separated). Rows are matched on sku; invalid rows are
+    skipped and reported, valid rows are applied in one transaction.
+    """
+    import io
+    from app.services.product_import_service import ProductImportService, ProductImportError
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    async with async_session() as session:
+        try:
+            report = await ProductImportService.import_csv(session, lines)
+        except (ProductImportError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await session.commit()
+    return report
+
+
 @router.put("/products/{product_id}")
 async def update_product(product_id: str, product_data: dict, user_id: str = Depends(get_admin_user)):
     async with async_session() as session:
@@ -266,6 +409,7 @@ async def update_product(product_id: str, product_data: dict, user_id: str = Dep
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         
+        product.sku = product_data.get("sku", product.sku)
         product.name = product_data.get("name", product.name)
         product.description = product_data.get("description", product.description)
         product.price = product_data.get("price", product.price)
@@ -300,36 +444,43 @@ async def delete_product(product_id: str, user_id: str = Depends(get_admin_user)
         return {"message": "Product deleted successfully"}
 
 
+def orders_query(
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """Filtered orders for /admin/orders, before paging"""
+    query = select(Order)
+    if status:
+        query = query.where(Order.status == status)
+    if created_from:
+        query = query.where(Order.created_at >= created_from)
+    if created_to:
+        query = query.where(Order.created_at < created_to)
+    return query
+
+
 @router.get("/orders")
-async def get_all_orders(user_id: str = Depends(get_admin_user)):
-    async with async_session() as session:
-        result = await session.execute(
-            select(Order).order_by(desc(Order.created_at))
-        )
-        orders = result.scalars().all()
+async def get_all_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: str = Depends(get_admin_user)
+):
+    from app.routers.orders import load_order_items
+    async with read_session(user_id) as session:
+        query = orders_query(status, created_from, created_to)
+        result = await session.execute(apply_keyset(query, Order.created_at, Order.id, cursor, limit))
+        orders = paginate(response, list(result.scalars().all()), limit)
+
+        items_map = await load_order_items(session, [order.id for order in orders])
         
-        from app.routers.orders import OrderResponse, OrderItemResponse
-        from app.db.models.order_items import OrderItem
-        from app.db.models.products import Product
-        
-        response = []
+        response_data = []
         for order in orders:
-            items_result = await session.execute(
-                select(OrderItem, Product)
-                .join(Product, OrderItem.product_id == Product.id)
-                .where(OrderItem.order_id == order.id)
-            )
-            
-            items = []
-            for order_item, product in items_result.all():
-                items.append({
-                    "product_id": str(order_item.product_id),
-                    "quantity": order_item.quantity,
-                    "price": float(order_item.price),
-                    "product_name": product.name
-                })
-            
-            response.append({
+            response_data.append({
                 "id": str(order.id),
                 "user_id": str(order.user_id),
                 "status": order.status,
@@ -337,25 +488,112 @@ async def get_all_orders(user_id: str = Depends(get_admin_user)):
                 "address": order.address or "",
                 "payment_method": "COD",
                 "created_at": order.created_at.isoformat() if order.created_at else datetime.utcnow().isoformat(),
-                "items": items
+                "items": items_map[order.id]
             })
         
-        return response
+        return response_data
 
 
 @router.put("/orders/{order_id}/status")
 async def update_order_status(order_id: str, status_data: dict, user_id: str = Depends(get_admin_user)):
+    from app.services.inventory_service import InventoryService
+    from app.services.order_events import OrderEventService
+    from app.services.rollup_service import RollupService
     async with async_session() as session:
-        result = await session.execute(select(Order).where(Order.id == UUID(order_id)))
+        result = await session.execute(
+            select(Order).where(Order.id == UUID(order_id)).with_for_update()
+        )
         order = result.scalar_one_or_none()
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         
-        order.status = status_data.get("status", order.status)
+        new_status = status_data.get("status", order.status)
+        if new_status not in ORDER_STATUSES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid status. Use one of: {', '.join(ORDER_STATUSES)}"
+            )
+        if new_status != order.status:
+            # Cancelling released the order's stock; reopening would need it back
+            if order.status == "cancelled":
+                raise HTTPException(status_code=409, detail="Cancelled orders can't change status")
+            if new_status == "cancelled":
+                # Return reserved stock and revenue in the same transaction as the status change
+                await InventoryService.release_order(session, order.id)
+                await RollupService.record_cancellation(session, order.created_at.date(), order.total_amount or 0)
+            await OrderEventService.record(session, order, new_status, previous_status=order.status)
+            order.status = new_status
         await session.commit()
         return {"message": "Order status updated successfully"}
 
 
+@router.get("/orders/{order_id}/events")
+async def get_order_events(order_id: str, user_id: str = Depends(get_admin_user)):
+    from app.db.models.order_events import OrderEvent
+    async with async_session() as session:
+        result = await session.execute(
+            select(OrderEvent)
+            .where(OrderEvent.order_id == UUID(order_id))
+            .order_by(OrderEvent.created_at)
+        )
+        return [
+            {
+                "id": str(event.id),
+                "event": event.event,
+                "created_at": event.created_at.isoformat() if event.created_at else None
+            }
+            for event in result.scalars().all()
+        ]
+
+
+@router.get("/outbox/metrics")
+async def get_outbox_metrics(user_id: str = Depends(get_admin_user)):
+    from app.services.outbox_dispatcher import outbox_dispatcher
+    return await outbox_dispatcher.metrics()
+
+
+@router.get("/cache/metrics")
+async def get_cache_metrics(user_id: str = Depends(get_admin_user)):
+    """Hit rates of this worker's in-process caches"""
+    from app.core.security import token_cache_stats
+    from app.services.role_service import role_cache
+    from app.services.session_store import session_cache
+    return {
+        "access_tokens": token_cache_stats(),
+        "roles": role_cache.stats(),
+        "sessions": session_cache.stats()
+    }
+
+
+@router.get("/db/pool")
+async def get_db_pool_status(user_id: str = Depends(get_admin_user)):
+    """Connection pool gauges for this worker, plus read-replica state"""
+    from app.db.session import engine
+    from app.db.pool_metrics import pool_status
+    from app.db.replica import replica_engine, replica_status
+    status = pool_status(engine.pool)
+    status["replica"] = replica_status()
+    if replica_engine is not None:
+        status["replica"]["pool"] = pool_status(replica_engine.pool)
+    return status
+
+
+@router.get("/db/statements")
+async def get_db_statements(
+    limit: int = Query(20, ge=1, le=200),
+    order_by: Literal["total_ms", "max_ms", "count", "rows"] = "total_ms",
+    route: Optional[str] = None,
+    user_id: str = Depends(get_admin_user)
+):
+    """Top SQL statements by fingerprint and route since this worker started"""
+    from app.db.query_stats import statement_stats
+    return {
+        "tracked": len(statement_stats),
+        "dropped": statement_stats.dropped,
+        "statements": statement_stats.top(limit, order_by, route),
+    }
+
+
 @router.get("/support/calls")
 async def get_support_calls(user_id: str = Depends(get_admin_user)):
     # Placeholder - would need a support_calls table
@@ -375,45 +613,57 @@ async def resolve_support_call(call_id: str, user_id: str = Depends(get_admin_us
 
 
 @router.get("/analytics")
-async def get_analytics(user_id: str = Depends(get_admin_user)):
-    async with async_session() as session:
-        # Region-wise diseases (placeholder - would need region data)
-        region_wise_diseases = [
-            {
-                "region": "North",
-                "diseases": [
-                    {"name": "Leaf Blight", "count": 45},
-                    {"name": "Root Rot", "count": 32}
-                ]
-            },
-            {
-                "region": "South",
-                "diseases": [
-                    {"name": "Powdery Mildew", "count": 38},
-                    {"name": "Leaf Blight", "count": 28}
-                ]
-            }
-        ]
-        
-        # Product conversion (placeholder)
-        product_conversion = []
-        
-        # Farmer engagement (placeholder)
-        farmer_engagement = []
-        for i in range(6):
-            month = (datetime.utcnow() - timedelta(days=30 * (5 - i))).strftime("%Y-%m")
-            farmer_engagement.append({
-                "month": month,
-                "active_farmers": 100 + i * 10,
-                "scans": 200 + i * 20,
-                "orders": 50 + i * 5
-            })
-        
-        return {
-            "region_wise_diseases": region_wise_diseases,
-            "product_conversion": product_conversion,
-            "farmer_engagement": farmer_engagement
-        }
+async def get_analytics(
+    since: Optional[date] = Query(None, description="First day (default: start of the month 5 months ago)"),
+    until: Optional[date] = Query(None, description="Exclusive end day (default: tomorrow)"),
+    user_id: str = Depends(get_admin_user)
+):
+    from app.services.analytics_service import region_wise_diseases, product_conversion, farmer_engagement
+
+    # Served from the aggregator's buckets; raw tables are never scanned here
+    until = until or date.today() + timedelta(days=1)
+    if since is None:
+        since = date.today().replace(day=1)
+        for _ in range(5):
+            since = (since - timedelta(days=1)).replace(day=1)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+
+    regions, conversion, engagement = await asyncio.gather(
+        region_wise_diseases(since, until),
+        product_conversion(since, until),
+        farmer_engagement(since, until)
+    )
+    return {
+        "region_wise_diseases": regions,
+        "product_conversion": conversion,
+        "farmer_engagement": engagement
+    }
+
+
+@router.get("/analytics/heatmap")
+async def get_disease_heatmap(
+    since: Optional[date] = Query(None, description="First day (default: 7 days before until)"),
+    until: Optional[date] = Query(None, description="Exclusive end day (default: tomorrow)"),
+    disease: Optional[str] = Query(None, description="Only this disease"),
+    precision: int = Query(5, ge=1, le=5, description="Geohash length of returned cells"),
+    limit: int = Query(500, ge=1, le=5000),
+    user_id: str = Depends(get_admin_user)
+):
+    from app.services.analytics_service import disease_heatmap
+
+    until = until or date.today() + timedelta(days=1)
+    since = since or until - timedelta(days=7)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+
+    return await disease_heatmap(
+        since,
+        until,
+        disease_name=disease or None,
+        precision=precision,
+        limit=limit
+    )
 
 
 @router.get("/settings")
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.future import select
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
-from app.db.session import async_session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_session
 from app.db.models.carts import Cart
 from app.db.models.cart_items import CartItem
 from app.db.models.products import Product
 from app.core.security import get_current_user_id
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 from uuid import UUID
 
 router = APIRouter(prefix="/cart", tags=["Cart"])
@@ -34,6 +37,16 @@ class CartResponse(BaseModel):
     total: float
 
 
+class CartOperation(BaseModel):
+    op: Literal["set", "increment", "remove"]
+    product_id: str
+    quantity: int = 0
+
+
+class CartPatchRequest(BaseModel):
+    operations: List[CartOperation]
+
+
 async def _get_cart_internal(session, user_id_uuid):
     """Internal function to get cart (used by other endpoints)"""
     # Get or create active cart
@@ -48,6 +61,11 @@ async def _get_cart_internal(session, user_id_uuid):
         await session.commit()
         await session.refresh(cart)
 
+    return await _build_cart_response(session, cart)
+
+
+async def _build_cart_response(session, cart):
+    """Build the cart response for an already loaded cart"""
     # Get cart items with product details
     items_result = await session.execute(
         select(CartItem, Product)
@@ -75,182 +93,282 @@ async def _get_cart_internal(session, user_id_uuid):
 
 
 @router.get("", response_model=CartResponse)
-async def get_cart(user_id: str = Depends(get_current_user_id)):
+async def get_cart(
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session)
+):
     """Get user's cart"""
-    async with async_session() as session:
-        return await _get_cart_internal(session, UUID(user_id))
+    return await _get_cart_internal(session, UUID(user_id))
 
 
-@router.post("/items", response_model=CartResponse)
-async def add_to_cart(item: CartItemRequest, user_id: str = Depends(get_current_user_id)):
-    """Add item to cart"""
-    async with async_session() as session:
-        # Get or create active cart
-        result = await session.execute(
-            select(Cart).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
-        )
-        cart = result.scalar_one_or_none()
+@router.patch("", response_model=CartResponse)
+async def patch_cart(
+    request: CartPatchRequest,
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Apply a batch of cart operations in one transaction.
+    Operations are applied in order:
+    - set: quantity becomes the given value (<= 0 removes the item)
+    - increment: quantity changes by the given value (may be negative)
+    - remove: item is removed
+    """
+    try:
+        operations = [(op.op, UUID(op.product_id), op.quantity) for op in request.operations]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid product id")
+
+    # Get or create active cart. The cart row is locked so concurrent edits
+    # (including ones adding products not yet in the cart) and checkout
+    # run one after another
+    result = await session.execute(
+        select(Cart)
+        .where(Cart.user_id == UUID(user_id), Cart.is_active == True)
+        .with_for_update()
+    )
+    cart = result.scalar_one_or_none()
 
-        if not cart:
-            cart = Cart(user_id=UUID(user_id), is_active=True)
-            session.add(cart)
-            await session.commit()
-            await session.refresh(cart)
+    if not cart:
+        cart = Cart(user_id=UUID(user_id), is_active=True)
+        session.add(cart)
+        await session.flush()
 
-        # Check if product exists
+    if not operations:
+        return await _build_cart_response(session, cart)
+
+    product_ids = {product_id for _, product_id, _ in operations}
+
+    # Validate every product that may end up in the cart with one query
+    added_ids = {product_id for op, product_id, _ in operations if op != "remove"}
+    if added_ids:
         product_result = await session.execute(
-            select(Product).where(Product.id == UUID(item.product_id), Product.is_active == True)
+            select(Product.id).where(Product.id.in_(added_ids), Product.is_active == True)
         )
-        product = product_result.scalar_one_or_none()
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
+        missing = added_ids - set(product_result.scalars().all())
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Products not found: {', '.join(sorted(str(p) for p in missing))}"
+            )
 
-        # Add or update cart item
-        item_result = await session.execute(
-            select(CartItem).where(
+    items_result = await session.execute(
+        select(CartItem.product_id, CartItem.quantity)
+        .where(CartItem.cart_id == cart.id, CartItem.product_id.in_(product_ids))
+    )
+    quantities = {product_id: quantity for product_id, quantity in items_result.all()}
+
+    for op, product_id, quantity in operations:
+        if op == "set":
+            quantities[product_id] = quantity
+        elif op == "increment":
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        else:
+            quantities[product_id] = 0
+
+    upserts = [
+        {"cart_id": cart.id, "product_id": product_id, "quantity": quantity}
+        for product_id, quantity in quantities.items()
+        if quantity > 0
+    ]
+    removals = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+
+    if upserts:
+        stmt = insert(CartItem).values(upserts)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[CartItem.cart_id, CartItem.product_id],
+                set_={"quantity": stmt.excluded.quantity},
+            )
+        )
+    if removals:
+        await session.execute(
+            delete(CartItem).where(
                 CartItem.cart_id == cart.id,
-                CartItem.product_id == UUID(item.product_id)
+                CartItem.product_id.in_(removals)
             )
         )
-        cart_item = item_result.scalar_one_or_none()
 
-        if cart_item:
-            # Update existing item quantity
-            cart_item.quantity = max(0, cart_item.quantity + item.quantity)
-            if cart_item.quantity <= 0:
-                await session.delete(cart_item)
-        else:
-            # Only create new item if quantity > 0
-            if item.quantity > 0:
-                # Use merge to handle potential race conditions
-                cart_item = CartItem(
-                    cart_id=cart.id,
-                    product_id=UUID(item.product_id),
-                    quantity=max(1, item.quantity)
-                )
-                # Check again before adding to avoid race condition
-                try:
-                    session.add(cart_item)
-                    await session.flush()  # Flush to catch any constraint violations early
-                except IntegrityError:
-                    # If item was added by another request, fetch and update it
-                    await session.rollback()
-                    item_result = await session.execute(
-                        select(CartItem).where(
-                            CartItem.cart_id == cart.id,
-                            CartItem.product_id == UUID(item.product_id)
-                        )
-                    )
-                    cart_item = item_result.scalar_one_or_none()
-                    if cart_item:
-                        cart_item.quantity = max(0, cart_item.quantity + item.quantity)
-                    else:
-                        raise HTTPException(status_code=500, detail="Failed to add item to cart")
+    await session.commit()
+    return await _build_cart_response(session, cart)
+
+
+@router.post("/items", response_model=CartResponse)
+async def add_to_cart(
+    item: CartItemRequest,
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session)
+):
+    """Add item to cart"""
+    # Get or create active cart
+    result = await session.execute(
+        select(Cart).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
+    )
+    cart = result.scalar_one_or_none()
 
+    if not cart:
+        cart = Cart(user_id=UUID(user_id), is_active=True)
+        session.add(cart)
         await session.commit()
+        await session.refresh(cart)
+
+    # Check if product exists
+    product_result = await session.execute(
+        select(Product).where(Product.id == UUID(item.product_id), Product.is_active == True)
+    )
+    product = product_result.scalar_one_or_none()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    # Add or update cart item
+    item_result = await session.execute(
+        select(CartItem).where(
+            CartItem.cart_id == cart.id,
+            CartItem.product_id == UUID(item.product_id)
+        )
+    )
+    cart_item = item_result.scalar_one_or_none()
+
+    if cart_item:
+        # Update existing item quantity
+        cart_item.quantity = max(0, cart_item.quantity + item.quantity)
+        if cart_item.quantity <= 0:
+            await session.delete(cart_item)
+    else:
+        # Only create new item if quantity > 0
+        if item.quantity > 0:
+            # Use merge to handle potential race conditions
+            cart_item = CartItem(
+                cart_id=cart.id,
+                product_id=UUID(item.product_id),
+                quantity=max(1, item.quantity)
+            )
+            # Check again before adding to avoid race condition
+            try:
+                session.add(cart_item)
+                await session.flush()  # Flush to catch any constraint violations early
+            except IntegrityError:
+                # If item was added by another request, fetch and update it
+                await session.rollback()
+                item_result = await session.execute(
+                    select(CartItem).where(
+                        CartItem.cart_id == cart.id,
+                        CartItem.product_id == UUID(item.product_id)
+                    )
+                )
+                cart_item = item_result.scalar_one_or_none()
+                if cart_item:
+                    cart_item.quantity = max(0, cart_item.quantity + item.quantity)
+                else:
+                    raise HTTPException(status_code=500, detail="Failed to add item to cart")
+
+    await session.commit()
 
-        # Return updated cart by fetching it
-        return await _get_cart_internal(session, UUID(user_id))
+    # Return updated cart by fetching it
+    return await _get_cart_internal(session, UUID(user_id))
 
 
 @router.put("/items/{product_id}", response_model=CartResponse)
 async def update_cart_item(
     product_id: str,
     quantity: int,
-    user_id: str = Depends(get_current_user_id)
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session)
 ):
     """Update cart item quantity"""
-    async with async_session() as session:
-        # Get active cart
-        result = await session.execute(
-            select(Cart).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
+    # Get active cart
+    result = await session.execute(
+        select(Cart).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
+    )
+    cart = result.scalar_one_or_none()
+    if not cart:
+        raise HTTPException(status_code=404, detail="Cart not found")
+
+    if quantity <= 0:
+        # Remove item
+        item_result = await session.execute(
+            select(CartItem).where(
+                CartItem.cart_id == cart.id,
+                CartItem.product_id == UUID(product_id)
+            )
         )
-        cart = result.scalar_one_or_none()
-        if not cart:
-            raise HTTPException(status_code=404, detail="Cart not found")
-
-        if quantity <= 0:
-            # Remove item
-            item_result = await session.execute(
-                select(CartItem).where(
-                    CartItem.cart_id == cart.id,
-                    CartItem.product_id == UUID(product_id)
-                )
+        cart_item = item_result.scalar_one_or_none()
+        if cart_item:
+            await session.delete(cart_item)
+    else:
+        # Update quantity
+        item_result = await session.execute(
+            select(CartItem).where(
+                CartItem.cart_id == cart.id,
+                CartItem.product_id == UUID(product_id)
             )
-            cart_item = item_result.scalar_one_or_none()
-            if cart_item:
-                await session.delete(cart_item)
+        )
+        cart_item = item_result.scalar_one_or_none()
+        if cart_item:
+            cart_item.quantity = quantity
         else:
-            # Update quantity
-            item_result = await session.execute(
-                select(CartItem).where(
-                    CartItem.cart_id == cart.id,
-                    CartItem.product_id == UUID(product_id)
-                )
+            # Check if product exists
+            product_result = await session.execute(
+                select(Product).where(Product.id == UUID(product_id), Product.is_active == True)
             )
-            cart_item = item_result.scalar_one_or_none()
-            if cart_item:
-                cart_item.quantity = quantity
-            else:
-                # Check if product exists
-                product_result = await session.execute(
-                    select(Product).where(Product.id == UUID(product_id), Product.is_active == True)
-                )
-                product = product_result.scalar_one_or_none()
-                if not product:
-                    raise HTTPException(status_code=404, detail="Product not found")
+            product = product_result.scalar_one_or_none()
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
                 
-                cart_item = CartItem(
-                    cart_id=cart.id,
-                    product_id=UUID(product_id),
-                    quantity=quantity
-                )
-                session.add(cart_item)
+            cart_item = CartItem(
+                cart_id=cart.id,
+                product_id=UUID(product_id),
+                quantity=quantity
+            )
+            session.add(cart_item)
 
-        await session.commit()
-        return await get_cart(user_id)
+    await session.commit()
+    # Reuse this session and the loaded cart for the response
+    return await _build_cart_response(session, cart)
 
 
 @router.delete("/items/{product_id}", response_model=CartResponse)
-async def remove_from_cart(product_id: str, user_id: str = Depends(get_current_user_id)):
+async def remove_from_cart(
+    product_id: str,
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session)
+):
     """Remove item from cart"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(Cart).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
-        )
-        cart = result.scalar_one_or_none()
-        if not cart:
-            raise HTTPException(status_code=404, detail="Cart not found")
+    result = await session.execute(
+        select(Cart).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
+    )
+    cart = result.scalar_one_or_none()
+    if not cart:
+        raise HTTPException(status_code=404, detail="Cart not found")
 
-        item_result = await session.execute(
-            select(CartItem).where(
-                CartItem.cart_id == cart.id,
-                CartItem.product_id == UUID(product_id)
-            )
+    item_result = await session.execute(
+        select(CartItem).where(
+            CartItem.cart_id == cart.id,
+            CartItem.product_id == UUID(product_id)
         )
-        cart_item = item_result.scalar_one_or_none()
-        if cart_item:
-            await session.delete(cart_item)
-            await session.commit()
+    )
+    cart_item = item_result.scalar_one_or_none()
+    if cart_item:
+        await session.delete(cart_item)
+        await session.commit()
 
-        return await _get_cart_internal(session, UUID(user_id))
+    return await _get_cart_internal(session, UUID(user_id))
 
 
 @router.delete("", response_model=dict)
-async def clear_cart(user_id: str = Depends(get_current_user_id)):
+async def clear_cart(
+    user_id: str = Depends(get_current_user_id),
+    session: AsyncSession = Depends(get_session)
+):
     """Clear all items from cart"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(Cart).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
-        )
-        cart = result.scalar_one_or_none()
-        if cart:
-            items_result = await session.execute(
-                select(CartItem).where(CartItem.cart_id == cart.id)
+    await session.execute(
+        delete(CartItem).where(
+            CartItem.cart_id.in_(
+                select(Cart.id).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
             )
-            for item in items_result.scalars().all():
-                await session.delete(item)
-            await session.commit()
+        )
+    )
+    await session.commit()
 
-        return {"success": True, "message": "Cart cleared"}
+    return {"success": True, "message": "Cart cleared"}
 
@@ -1,16 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.future import select
+from sqlalchemy import delete, insert
 from app.db.session import async_session
+from app.db.replica import read_session
 from app.db.models.orders import Order
 from app.db.models.order_items import OrderItem
 from app.db.models.carts import Cart
 from app.db.models.cart_items import CartItem
 from app.db.models.products import Product
 from app.core.security import get_current_user_id
+from app.core.pagination import apply_keyset, paginate
+from app.services.inventory_service import InventoryService, InsufficientStockError
+from app.services.idempotency_service import IdempotencyService
+from app.services.order_events import OrderEventService
+from app.services.rollup_service import RollupService
+from app.services.order_stream import order_stream_hub, load_events_since, SentEventIds
+from app.core.config import get_settings
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
+import asyncio
+import json
+
+settings = get_settings()
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
@@ -43,65 +57,94 @@ class OrderResponse(BaseModel):
 
 
 @router.post("", response_model=OrderResponse)
-async def create_order(request: CreateOrderRequest, user_id: str = Depends(get_current_user_id)):
-    """Create a new order from cart"""
+async def create_order(
+    request: CreateOrderRequest,
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Create a new order from cart. Retries with the same Idempotency-Key return the original order."""
+    return await IdempotencyService.run(
+        user_id, idempotency_key, "POST /orders",
+        lambda: _create_order(request, user_id)
+    )
+
+
+async def _create_order(request: CreateOrderRequest, user_id: str) -> OrderResponse:
     async with async_session() as session:
-        # Get active cart
+        # Get active cart, locked so a concurrent checkout of the same cart waits
         cart_result = await session.execute(
-            select(Cart).where(Cart.user_id == UUID(user_id), Cart.is_active == True)
+            select(Cart)
+            .where(Cart.user_id == UUID(user_id), Cart.is_active == True)
+            .with_for_update()
         )
         cart = cart_result.scalar_one_or_none()
         
         if not cart:
             raise HTTPException(status_code=400, detail="Cart is empty")
 
-        # Get cart items
+        # Read the cart once: these rows are what gets reserved and ordered,
+        # so an item added concurrently can't enter the order unreserved
         items_result = await session.execute(
-            select(CartItem, Product)
+            select(CartItem.product_id, CartItem.quantity, Product.price, Product.name)
             .join(Product, CartItem.product_id == Product.id)
             .where(CartItem.cart_id == cart.id)
         )
-
-        cart_items = list(items_result.all())
-        if not cart_items:
+        cart_rows = items_result.all()
+        if not cart_rows:
             raise HTTPException(status_code=400, detail="Cart is empty")
 
-        # Calculate total
-        total = sum(float(product.price) * cart_item.quantity for cart_item, product in cart_items)
+        # Reserve stock; any short line fails the whole order
+        try:
+            await InventoryService.reserve(
+                session, {product_id: quantity for product_id, quantity, _, _ in cart_rows}
+            )
+        except InsufficientStockError as e:
+            await session.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "message": "Insufficient stock",
+                    "product_ids": [str(p) for p in e.product_ids]
+                }
+            )
 
         # Create order
         order = Order(
             user_id=UUID(user_id),
             status="placed",
-            total_amount=total,
             address=request.address,
             created_at=datetime.utcnow()
         )
         session.add(order)
-        await session.commit()
-        await session.refresh(order)
+        await session.flush()
+        await OrderEventService.record(session, order, "placed")
+
+        # Order items from the reserved cart rows, snapshotting current prices
+        await session.execute(
+            insert(OrderItem),
+            [
+                {"order_id": order.id, "product_id": product_id, "quantity": quantity, "price": price}
+                for product_id, quantity, price, _ in cart_rows
+            ]
+        )
 
-        # Create order items
         order_items = []
-        for cart_item, product in cart_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=cart_item.product_id,
-                quantity=cart_item.quantity,
-                price=float(product.price)
-            )
-            session.add(order_item)
+        total = 0.0
+        for product_id, quantity, price, name in cart_rows:
+            total += float(price) * quantity
             order_items.append({
-                "product_id": str(cart_item.product_id),
-                "quantity": cart_item.quantity,
-                "price": float(product.price),
-                "product_name": product.name
+                "product_id": str(product_id),
+                "quantity": quantity,
+                "price": float(price),
+                "product_name": name
             })
+        order.total_amount = total
+        await RollupService.record_order(session, order.created_at.date(), total)
 
         # Clear cart
-        for cart_item, _ in cart_items:
-            await session.delete(cart_item)
+        await session.execute(delete(CartItem).where(CartItem.cart_id == cart.id))
         cart.is_active = False
+        await IdempotencyService.mark_committed(session)
         await session.commit()
 
         return OrderResponse(
@@ -115,83 +158,134 @@ async def create_order(request: CreateOrderRequest, user_id: str = Depends(get_c
         )
 
 
+async def load_order_items(session, order_ids) -> dict:
+    """Load items for a batch of orders with one IN query, grouped by order id"""
+    items_map: dict = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return items_map
+
+    items_result = await session.execute(
+        select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.price, Product.name)
+        .join(Product, OrderItem.product_id == Product.id)
+        .where(OrderItem.order_id.in_(order_ids))
+    )
+    for order_id, product_id, quantity, price, product_name in items_result.all():
+        items_map[order_id].append(OrderItemResponse(
+            product_id=str(product_id),
+            quantity=quantity,
+            price=float(price),
+            product_name=product_name
+        ))
+    return items_map
+
+
+def _order_response(order: Order, items: List[OrderItemResponse]) -> OrderResponse:
+    return OrderResponse(
+        id=str(order.id),
+        status=order.status,
+        total_amount=float(order.total_amount),
+        address=order.address or "",
+        payment_method="COD",
+        created_at=order.created_at.isoformat(),
+        items=items
+    )
+
+
+def orders_page_query(user_id: str, cursor: Optional[str], limit: int):
+    return apply_keyset(
+        select(Order).where(Order.user_id == UUID(user_id)),
+        Order.created_at, Order.id, cursor, limit
+    )
+
+
+def order_query(order_id: str, user_id: str):
+    return select(Order).where(Order.id == UUID(order_id), Order.user_id == UUID(user_id))
+
+
 @router.get("", response_model=List[OrderResponse])
-async def get_orders(user_id: str = Depends(get_current_user_id)):
-    """Get all orders for user"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(Order)
-            .where(Order.user_id == UUID(user_id))
-            .order_by(Order.created_at.desc())
-        )
-        orders = result.scalars().all()
-
-        response = []
-        for order in orders:
-            # Get order items
-            items_result = await session.execute(
-                select(OrderItem, Product)
-                .join(Product, OrderItem.product_id == Product.id)
-                .where(OrderItem.order_id == order.id)
-            )
+async def get_orders(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Get orders for user, newest first.
+    When more orders exist, the X-Next-Cursor header holds the cursor for the next page.
+    """
+    async with read_session(user_id) as session:
+        result = await session.execute(orders_page_query(user_id, cursor, limit))
+        orders = paginate(response, list(result.scalars().all()), limit)
+
+        items_map = await load_order_items(session, [order.id for order in orders])
+        return [_order_response(order, items_map[order.id]) for order in orders]
+
+
+def _format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: order_status\ndata: {json.dumps(event['payload'])}\n\n"
+
 
-            items = []
-            for order_item, product in items_result.all():
-                items.append(OrderItemResponse(
-                    product_id=str(order_item.product_id),
-                    quantity=order_item.quantity,
-                    price=float(order_item.price),
-                    product_name=product.name
-                ))
+@router.get("/stream")
+async def stream_order_updates(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Server-Sent Events stream of the user's order status changes.
+    Reconnects with Last-Event-ID replay the events missed in between.
+    """
+    try:
+        last_sent = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
 
-            response.append(OrderResponse(
-                id=str(order.id),
-                status=order.status,
-                total_amount=float(order.total_amount),
-                address=order.address or "",
-                payment_method="COD",
-                created_at=order.created_at.isoformat(),
-                items=items
-            ))
+    async def event_stream():
+        # Subscribe before replaying so nothing committed in between is lost
+        queue = order_stream_hub.subscribe(user_id)
+        sent = SentEventIds()
+        sent.add(last_sent)
+        try:
+            yield f"retry: {settings.ORDER_STREAM_RETRY_MS}\n\n"
+            if last_event_id:
+                for event in await load_events_since(user_id, last_sent):
+                    if sent.add(event["id"]):
+                        yield _format_sse(event)
 
-        return response
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.ORDER_STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    # Fell behind; the client reconnects and resumes from Last-Event-ID
+                    break
+                # Already sent by the replay (or a duplicate notification)
+                if not sent.add(event["id"]):
+                    continue
+                yield _format_sse(event)
+        finally:
+            order_stream_hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(order_id: str, user_id: str = Depends(get_current_user_id)):
     """Get a single order by ID"""
-    async with async_session() as session:
-        result = await session.execute(
-            select(Order).where(Order.id == UUID(order_id), Order.user_id == UUID(user_id))
-        )
+    async with read_session(user_id) as session:
+        result = await session.execute(order_query(order_id, user_id))
         order = result.scalar_one_or_none()
         
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
 
-        # Get order items
-        items_result = await session.execute(
-            select(OrderItem, Product)
-            .join(Product, OrderItem.product_id == Product.id)
-            .where(OrderItem.order_id == order.id)
-        )
-
-        items = []
-        for order_item, product in items_result.all():
-            items.append(OrderItemResponse(
-                product_id=str(order_item.product_id),
-                quantity=order_item.quantity,
-                price=float(order_item.price),
-                product_name=product.name
-            ))
-
-        return OrderResponse(
-            id=str(order.id),
-            status=order.status,
-            total_amount=float(order.total_amount),
-            address=order.address or "",
-            payment_method="COD",
-            created_at=order.created_at.isoformat(),
-            items=items
-        )
-
+        items_map = await load_order_items(session, [order.id])
+        return _order_response(order, items_map[order.id])
@@ -2,21 +2,26 @@
 Improved Plant Analysis Router with Hybrid AI System
 Implements: Image hashing, consensus analysis, product matching
 """
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException, Depends, Header
 from PIL import Image
 import io
 import base64
 import json
 import logging
+from typing import Optional
 
 from app.core.config import get_settings
+from app.core import geohash
 from app.core.security import get_current_user_id
 from app.db.models import PlantScan, ScanResult
 from app.db.session import async_session
 from app.services.image_hash_service import ImageHashService
 from app.services.consensus_analyzer import ConsensusAnalyzer
 from app.services.product_matcher import ProductMatcher
-from sqlalchemy import select
+from app.services.idempotency_service import IdempotencyService
+from app.services.rollup_service import RollupService
+from app.services.rate_limiter import rate_limiter, ANALYZE_RATE
+from sqlalchemy import select, func
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -31,7 +36,10 @@ consensus_analyzer = ConsensusAnalyzer()
 @router.post("/analyze")
 async def analyze_plant(
     file: UploadFile = File(...), 
-    user_id: str = Depends(get_current_user_id)
+    latitude: Optional[float] = Form(None),
+    longitude: Optional[float] = Form(None),
+    user_id: str = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Analyze plant image with hybrid AI system:
@@ -39,7 +47,42 @@ async def analyze_plant(
     2. Use consensus-based AI analysis
     3. Validate against product database
     4. Store results for future matching
+    Optional latitude/longitude geotag the scan for incidence analytics.
+    Retries with the same Idempotency-Key return the original result.
     """
+    location = _validate_location(latitude, longitude)
+    return await IdempotencyService.run(
+        user_id, idempotency_key, "POST /plant/analyze",
+        lambda: _analyze_plant(file, user_id, location)
+    )
+
+
+def _validate_location(latitude: Optional[float], longitude: Optional[float]) -> Optional[tuple]:
+    if latitude is None and longitude is None:
+        return None
+    if latitude is None or longitude is None:
+        raise HTTPException(status_code=400, detail="latitude and longitude must be sent together")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise HTTPException(status_code=400, detail="latitude/longitude out of range")
+    return latitude, longitude
+
+
+def exact_duplicate_query(md5_hash: str):
+    return select(PlantScan).where(PlantScan.image_hash_md5 == md5_hash)
+
+
+def similar_candidates_query():
+    """Recent perceptually hashed scans to compare against (bounded for performance)"""
+    return select(PlantScan).where(
+        PlantScan.image_hash_phash.isnot(None)
+    ).order_by(PlantScan.created_at.desc()).limit(100)
+
+
+def scan_result_query(scan_id):
+    return select(ScanResult).where(ScanResult.scan_id == scan_id)
+
+
+async def _analyze_plant(file: UploadFile, user_id: str, location: Optional[tuple] = None):
     print("Received file:", file.filename, file.content_type)
     contents = await file.read()
 
@@ -73,16 +116,12 @@ async def analyze_plant(
         
         if md5_hash:
             # Check for exact duplicate (MD5)
-            query = select(PlantScan).where(PlantScan.image_hash_md5 == md5_hash)
-            result = await session.execute(query)
+            result = await session.execute(exact_duplicate_query(md5_hash))
             exact_duplicate = result.scalar_one_or_none()
             
             if exact_duplicate:
                 # Get result from duplicate scan
-                result_query = select(ScanResult).where(
-                    ScanResult.scan_id == exact_duplicate.id
-                )
-                result_result = await session.execute(result_query)
+                result_result = await session.execute(scan_result_query(exact_duplicate.id))
                 duplicate_result = result_result.scalar_one_or_none()
                 
                 if duplicate_result:
@@ -96,11 +135,7 @@ async def analyze_plant(
         
         # Check for similar images (perceptual hash)
         if phash:
-            query = select(PlantScan).where(
-                PlantScan.image_hash_phash.isnot(None)
-            ).order_by(PlantScan.created_at.desc()).limit(100)  # Check recent scans for performance
-            
-            result = await session.execute(query)
+            result = await session.execute(similar_candidates_query())
             recent_scans = result.scalars().all()
             
             best_match = None
@@ -117,10 +152,7 @@ async def analyze_plant(
             
             if best_match:
                 # Get result from similar scan
-                result_query = select(ScanResult).where(
-                    ScanResult.scan_id == best_match.id
-                )
-                result_result = await session.execute(result_query)
+                result_result = await session.execute(scan_result_query(best_match.id))
                 similar_result_obj = result_result.scalar_one_or_none()
                 
                 if similar_result_obj:
@@ -130,6 +162,12 @@ async def analyze_plant(
 
         # Step 3: Run consensus-based AI analysis (if no similar match found)
         if not similar_scan:
+            # End the lookup transaction so neither it nor its pooled connection
+            # stays open across the AI calls
+            await session.commit()
+            # Only the paid AI calls are metered: invalid images, duplicates
+            # and idempotent replays never get here
+            await rate_limiter.check(f"analyze:{user_id}", ANALYZE_RATE, detail="Scan limit reached. Try later.")
             try:
                 ai_result = await consensus_analyzer.analyze_with_consensus(
                     img_base64, num_runs=3
@@ -169,9 +207,16 @@ async def analyze_plant(
             image_hash_dct=avg_hash,  # Using avg_hash instead of dct_hash
             image_hash_md5=md5_hash,
             is_duplicate=similar_scan is not None,
-            original_scan_id=similar_scan.id if similar_scan else None
+            original_scan_id=similar_scan.id if similar_scan else None,
+            latitude=location[0] if location else None,
+            longitude=location[1] if location else None,
+            geohash=geohash.encode(*location) if location else None,
+            # Insert time, not transaction start (now()), so the row never lands
+            # behind the analytics watermark
+            created_at=func.clock_timestamp()
         )
         session.add(scan)
+        await IdempotencyService.mark_committed(session)
         await session.commit()
         await session.refresh(scan)
         
@@ -181,6 +226,7 @@ async def analyze_plant(
             result_json=ai_result
         )
         session.add(scan_result)
+        await RollupService.record_scan(session, scan.created_at.date(), ai_result)
         await session.commit()
 
         # Step 7: Create product recommendations
@@ -0,0 +1,464 @@
+"""
+Analytics Service
+Background aggregator that folds new raw rows into daily/monthly analytics
+buckets, plus the read queries behind /admin/analytics.
+
+Each raw source keeps a watermark; every pass aggregates the window
+[watermark, now - settle delay) with set-based upserts and advances the
+watermark in the same transaction, so each row is counted exactly once.
+The settle delay leaves time for in-flight transactions to commit, so
+writers must stamp created_at close to their commit (plant scans use
+clock_timestamp() at insert rather than the transaction start).
+Geotagged scans are also bucketed per geohash cell and checked for outbreaks.
+A fresh database catches up from the oldest raw row automatically.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, func, cast, literal, text, Date, Float
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import geohash
+from app.core.config import get_settings
+from app.db.models import (
+    AnalyticsDiseaseRegion,
+    AnalyticsProductFunnel,
+    AnalyticsMonthlyActiveUser,
+    AnalyticsWatermark,
+    DailyStat,
+    GeoDiseaseCount,
+    GeoOutbreak,
+    PlantScan,
+    ScanResult,
+    ScanProductRecommendation,
+    Order,
+    OrderItem,
+    Product,
+)
+from app.db.replica import read_session
+from app.db.session import async_session
+from app.services.rollup_service import UNKNOWN_DISEASE, normalize_disease_value
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+UNKNOWN_REGION = "Unknown"
+# Cap per pass so catching up on history runs in bounded transactions
+MAX_WINDOW = timedelta(days=1)
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+async def _aggregate_scan_results(session: AsyncSession, since: datetime, until: datetime) -> None:
+    day = cast(ScanResult.created_at, Date)
+    in_window = (ScanResult.created_at >= since) & (ScanResult.created_at < until)
+    known_disease = (
+        ScanResult.disease_name.isnot(None)
+        & (ScanResult.disease_name != "")
+        & (ScanResult.disease_name != UNKNOWN_DISEASE)
+    )
+
+    # Region-wise diseases; regions are coarse geohash cells, untagged scans count as Unknown
+    region = func.coalesce(func.substr(PlantScan.geohash, 1, geohash.REGION_PRECISION), UNKNOWN_REGION)
+    disease_query = (
+        select(day, region, ScanResult.disease_name, func.count())
+        .join(PlantScan, ScanResult.scan_id == PlantScan.id)
+        .where(in_window, known_disease)
+        .group_by(text("1"), text("2"), text("3"))
+    )
+    stmt = insert(AnalyticsDiseaseRegion).from_select(
+        ["day", "region", "disease_name", "count"], disease_query
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[AnalyticsDiseaseRegion.day, AnalyticsDiseaseRegion.region, AnalyticsDiseaseRegion.disease_name],
+        set_={"count": AnalyticsDiseaseRegion.count + stmt.excluded.count}
+    ))
+
+    # Heatmap cells for geotagged scans
+    cell_query = (
+        select(day, func.substr(PlantScan.geohash, 1, geohash.CELL_PRECISION), ScanResult.disease_name, func.count())
+        .join(PlantScan, ScanResult.scan_id == PlantScan.id)
+        .where(in_window, known_disease, PlantScan.geohash.isnot(None))
+        .group_by(text("1"), text("2"), text("3"))
+    )
+    stmt = insert(GeoDiseaseCount).from_select(["day", "cell", "disease_name", "count"], cell_query)
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[GeoDiseaseCount.day, GeoDiseaseCount.cell, GeoDiseaseCount.disease_name],
+        set_={"count": GeoDiseaseCount.count + stmt.excluded.count}
+    ))
+
+    for touched_day in sorted({since.date(), until.date()}):
+        await _detect_outbreaks(session, touched_day)
+
+    # Recommendations shown, counted on the day the result was produced
+    recommendation_query = (
+        select(day, ScanProductRecommendation.product_id, func.count(), literal(0), literal(0))
+        .join(ScanProductRecommendation, ScanProductRecommendation.scan_id == ScanResult.scan_id)
+        .where(in_window)
+        .group_by(text("1"), text("2"))
+    )
+    stmt = insert(AnalyticsProductFunnel).from_select(
+        ["day", "product_id", "recommendations", "orders", "units"], recommendation_query
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[AnalyticsProductFunnel.day, AnalyticsProductFunnel.product_id],
+        set_={"recommendations": AnalyticsProductFunnel.recommendations + stmt.excluded.recommendations}
+    ))
+
+
+async def _detect_outbreaks(session: AsyncSession, day: date) -> None:
+    """
+    Flag (cell, disease) pairs whose count over the sliding window ending on
+    day exceeds OUTBREAK_RATIO x the rate of the baseline period before it.
+    Reads only the daily cell buckets, so cost is independent of raw scan volume.
+    """
+    window_days = settings.OUTBREAK_WINDOW_DAYS
+    baseline_days = settings.OUTBREAK_BASELINE_DAYS
+    window_start = day - timedelta(days=window_days - 1)
+    baseline_start = window_start - timedelta(days=baseline_days)
+
+    recent = func.coalesce(func.sum(GeoDiseaseCount.count).filter(GeoDiseaseCount.day >= window_start), 0)
+    baseline = func.coalesce(func.sum(GeoDiseaseCount.count).filter(GeoDiseaseCount.day < window_start), 0)
+    detection_query = (
+        select(literal(day), GeoDiseaseCount.cell, GeoDiseaseCount.disease_name, recent, baseline)
+        .where(GeoDiseaseCount.day >= baseline_start, GeoDiseaseCount.day <= day)
+        .group_by(GeoDiseaseCount.cell, GeoDiseaseCount.disease_name)
+        .having(
+            (recent >= settings.OUTBREAK_MIN_COUNT)
+            # Compare rates: recent / window_days > ratio * baseline / baseline_days
+            & (recent * baseline_days > literal(settings.OUTBREAK_RATIO, Float) * baseline * window_days)
+        )
+    )
+    stmt = insert(GeoOutbreak).from_select(
+        ["day", "cell", "disease_name", "recent_count", "baseline_count"], detection_query
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[GeoOutbreak.day, GeoOutbreak.cell, GeoOutbreak.disease_name],
+        set_={
+            "recent_count": stmt.excluded.recent_count,
+            "baseline_count": stmt.excluded.baseline_count,
+            "detected_at": func.now(),
+        }
+    ))
+
+
+async def _aggregate_plant_scans(session: AsyncSession, since: datetime, until: datetime) -> None:
+    month = cast(func.date_trunc("month", PlantScan.created_at), Date)
+    await session.execute(
+        insert(AnalyticsMonthlyActiveUser)
+        .from_select(
+            ["month", "user_id"],
+            select(month, PlantScan.user_id)
+            .where(PlantScan.created_at >= since, PlantScan.created_at < until)
+            .distinct()
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+async def _aggregate_orders(session: AsyncSession, since: datetime, until: datetime) -> None:
+    in_window = (Order.created_at >= since) & (Order.created_at < until)
+
+    month = cast(func.date_trunc("month", Order.created_at), Date)
+    await session.execute(
+        insert(AnalyticsMonthlyActiveUser)
+        .from_select(
+            ["month", "user_id"],
+            select(month, Order.user_id).where(in_window, Order.user_id.isnot(None)).distinct()
+        )
+        .on_conflict_do_nothing()
+    )
+
+    # An order line converts if the same user was recommended that product
+    # by a scan within the attribution window before ordering
+    attributed = (
+        select(literal(1))
+        .select_from(ScanProductRecommendation)
+        .join(PlantScan, ScanProductRecommendation.scan_id == PlantScan.id)
+        .where(
+            ScanProductRecommendation.product_id == OrderItem.product_id,
+            PlantScan.user_id == Order.user_id,
+            PlantScan.created_at <= Order.created_at,
+            PlantScan.created_at >= Order.created_at - timedelta(days=settings.ANALYTICS_ATTRIBUTION_DAYS),
+        )
+        .exists()
+    )
+    conversion_query = (
+        select(cast(Order.created_at, Date), OrderItem.product_id, literal(0), func.count(), func.sum(OrderItem.quantity))
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .where(in_window, attributed)
+        .group_by(text("1"), text("2"))
+    )
+    stmt = insert(AnalyticsProductFunnel).from_select(
+        ["day", "product_id", "recommendations", "orders", "units"], conversion_query
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[AnalyticsProductFunnel.day, AnalyticsProductFunnel.product_id],
+        set_={
+            "orders": AnalyticsProductFunnel.orders + stmt.excluded.orders,
+            "units": AnalyticsProductFunnel.units + stmt.excluded.units,
+        }
+    ))
+
+
+# source name -> (created_at column, aggregation step)
+SOURCES: Dict[str, tuple] = {
+    "scan_results": (ScanResult.created_at, _aggregate_scan_results),
+    "plant_scans": (PlantScan.created_at, _aggregate_plant_scans),
+    "orders": (Order.created_at, _aggregate_orders),
+}
+
+
+class AnalyticsAggregator:
+    """Periodically advances every source's watermark"""
+
+    def __init__(self, interval_seconds: float = 60, settle_seconds: int = 60):
+        self.interval_seconds = interval_seconds
+        self.settle = timedelta(seconds=settle_seconds)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _advance(self, source: str) -> bool:
+        """Aggregate one window for source. Returns True if more windows are ready."""
+        created_at_column, aggregate = SOURCES[source]
+        async with async_session() as session:
+            now = (await session.execute(select(func.localtimestamp()))).scalar_one()
+            horizon = now - self.settle
+
+            # A worker holding the row is already advancing this source
+            result = await session.execute(
+                select(AnalyticsWatermark)
+                .where(AnalyticsWatermark.source == source)
+                .with_for_update(skip_locked=True)
+            )
+            watermark = result.scalar_one_or_none()
+            if watermark is None:
+                # Locked elsewhere, or not created yet
+                exists = (await session.execute(
+                    select(AnalyticsWatermark.source).where(AnalyticsWatermark.source == source)
+                )).scalar_one_or_none()
+                if exists is None:
+                    # Start a new source at its oldest row
+                    oldest = (await session.execute(select(func.min(created_at_column)))).scalar_one()
+                    await session.execute(
+                        insert(AnalyticsWatermark)
+                        .values(source=source, processed_until=oldest or horizon)
+                        .on_conflict_do_nothing()
+                    )
+                await session.commit()
+                return exists is None
+
+            since = watermark.processed_until
+            until = min(horizon, since + MAX_WINDOW)
+            if until <= since:
+                await session.commit()
+                return False
+
+            await aggregate(session, since, until)
+            watermark.processed_until = until
+            await session.commit()
+            return until < horizon
+
+    async def run_once(self) -> None:
+        for source in SOURCES:
+            while await self._advance(source):
+                pass
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Analytics aggregation failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Statement builders for the reads below; app.db.plan_check EXPLAINs them too
+
+def region_wise_diseases_query(since: date, until: date):
+    total = func.sum(AnalyticsDiseaseRegion.count)
+    return (
+        select(AnalyticsDiseaseRegion.region, AnalyticsDiseaseRegion.disease_name, total)
+        .where(AnalyticsDiseaseRegion.day >= since, AnalyticsDiseaseRegion.day < until)
+        .group_by(AnalyticsDiseaseRegion.region, AnalyticsDiseaseRegion.disease_name)
+        .order_by(AnalyticsDiseaseRegion.region, total.desc())
+    )
+
+
+def product_conversion_query(since: date, until: date, limit: int = 20):
+    recommendations = func.sum(AnalyticsProductFunnel.recommendations)
+    orders = func.sum(AnalyticsProductFunnel.orders)
+    units = func.sum(AnalyticsProductFunnel.units)
+    return (
+        select(AnalyticsProductFunnel.product_id, Product.name, recommendations, orders, units)
+        .join(Product, AnalyticsProductFunnel.product_id == Product.id)
+        .where(AnalyticsProductFunnel.day >= since, AnalyticsProductFunnel.day < until)
+        .group_by(AnalyticsProductFunnel.product_id, Product.name)
+        .order_by(recommendations.desc())
+        .limit(limit)
+    )
+
+
+def monthly_active_farmers_query(since: date, until: date):
+    return (
+        select(AnalyticsMonthlyActiveUser.month, func.count())
+        .where(AnalyticsMonthlyActiveUser.month >= _month_start(since), AnalyticsMonthlyActiveUser.month < until)
+        .group_by(AnalyticsMonthlyActiveUser.month)
+    )
+
+
+def monthly_totals_query(since: date, until: date):
+    stat_month = cast(func.date_trunc("month", DailyStat.day), Date)
+    return (
+        select(stat_month, func.sum(DailyStat.scans), func.sum(DailyStat.orders))
+        .where(DailyStat.day >= _month_start(since), DailyStat.day < until)
+        .group_by(text("1"))
+    )
+
+
+def heatmap_queries(
+    since: date,
+    until: date,
+    disease_name: Optional[str] = None,
+    precision: int = geohash.CELL_PRECISION,
+    limit: int = 500
+) -> Tuple[Any, Any]:
+    """(cells, outbreaks) statements for disease_heatmap"""
+    cell = func.substr(GeoDiseaseCount.cell, 1, precision)
+    total = func.sum(GeoDiseaseCount.count)
+    cells_query = (
+        select(cell, total)
+        .where(GeoDiseaseCount.day >= since, GeoDiseaseCount.day < until)
+        .group_by(text("1"))
+        .order_by(total.desc())
+        .limit(limit)
+    )
+    outbreaks_query = (
+        select(
+            GeoOutbreak.cell,
+            GeoOutbreak.disease_name,
+            func.max(GeoOutbreak.day),
+            func.max(GeoOutbreak.recent_count),
+            func.min(GeoOutbreak.baseline_count),
+        )
+        .where(GeoOutbreak.day >= since, GeoOutbreak.day < until)
+        .group_by(GeoOutbreak.cell, GeoOutbreak.disease_name)
+    )
+    if disease_name:
+        # Stored names come from scan_results.disease_name; normalize the filter the same way
+        cells_query = cells_query.where(GeoDiseaseCount.disease_name == normalize_disease_value(disease_name))
+        outbreaks_query = outbreaks_query.where(GeoOutbreak.disease_name == normalize_disease_value(disease_name))
+    return cells_query, outbreaks_query
+
+
+async def region_wise_diseases(since: date, until: date, per_region: int = 5) -> List[Dict]:
+    async with read_session() as session:
+        result = await session.execute(region_wise_diseases_query(since, until))
+        regions: Dict[str, List[Dict]] = defaultdict(list)
+        for region, disease_name, count in result.all():
+            if len(regions[region]) < per_region:
+                regions[region].append({"name": disease_name, "count": int(count)})
+        return [{"region": region, "diseases": diseases} for region, diseases in regions.items()]
+
+
+async def product_conversion(since: date, until: date, limit: int = 20) -> List[Dict]:
+    async with read_session() as session:
+        result = await session.execute(product_conversion_query(since, until, limit))
+        return [
+            {
+                "product_id": str(product_id),
+                "product_name": name,
+                "recommendations": int(recommended),
+                "orders": int(ordered),
+                "units": int(sold),
+                "conversion_rate": round(ordered / recommended, 4) if recommended else 0.0,
+            }
+            for product_id, name, recommended, ordered, sold in result.all()
+        ]
+
+
+async def farmer_engagement(since: date, until: date) -> List[Dict]:
+    months: Dict[date, Dict] = {}
+    month = _month_start(since)
+    while month < until:
+        months[month] = {"month": month.strftime("%Y-%m"), "active_farmers": 0, "scans": 0, "orders": 0}
+        month = (month + timedelta(days=32)).replace(day=1)
+
+    async with read_session() as session:
+        active_result = await session.execute(monthly_active_farmers_query(since, until))
+        for month, active in active_result.all():
+            if month in months:
+                months[month]["active_farmers"] = active
+
+        stats_result = await session.execute(monthly_totals_query(since, until))
+        for month, scans, orders in stats_result.all():
+            if month in months:
+                months[month]["scans"] = int(scans)
+                months[month]["orders"] = int(orders)
+
+    return list(months.values())
+
+
+async def disease_heatmap(
+    since: date,
+    until: date,
+    disease_name: Optional[str] = None,
+    precision: int = geohash.CELL_PRECISION,
+    limit: int = 500
+) -> Dict:
+    """Per-cell scan counts and outbreak flags for days in [since, until)"""
+    cells_query, outbreaks_query = heatmap_queries(since, until, disease_name, precision, limit)
+    async with read_session() as session:
+        cell_rows = (await session.execute(cells_query)).all()
+        outbreak_rows = (await session.execute(outbreaks_query)).all()
+
+    outbreaks = []
+    flagged = set()
+    for outbreak_cell, outbreak_disease, last_day, recent_count, baseline_count in outbreak_rows:
+        latitude, longitude = geohash.decode(outbreak_cell)
+        flagged.add(outbreak_cell[:precision])
+        outbreaks.append({
+            "cell": outbreak_cell,
+            "latitude": latitude,
+            "longitude": longitude,
+            "disease_name": outbreak_disease,
+            "day": last_day.isoformat(),
+            "recent_count": recent_count,
+            "baseline_count": baseline_count,
+        })
+
+    cells = []
+    for cell_key, count in cell_rows:
+        latitude, longitude = geohash.decode(cell_key)
+        cells.append({
+            "cell": cell_key,
+            "latitude": latitude,
+            "longitude": longitude,
+            "count": int(count),
+            "outbreak": cell_key in flagged,
+        })
+    return {"precision": precision, "cells": cells, "outbreaks": outbreaks}
+
+
+analytics_aggregator = AnalyticsAggregator(
+    interval_seconds=settings.ANALYTICS_INTERVAL_SECONDS,
+    settle_seconds=settings.ANALYTICS_SETTLE_SECONDS
+)
@@ -0,0 +1,66 @@
+"""
+Batch Sweeper
+Background worker that periodically runs a DELETE in small batches until a
+batch comes back short, e.g. to purge expired sessions or idempotency keys.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+from app.db.session import async_session
+
+logger = logging.getLogger(__name__)
+
+
+class BatchSweeper:
+    """Periodically runs delete_batch(batch_size) until fewer rows than batch_size go"""
+
+    def __init__(
+        self,
+        name: str,
+        delete_batch: Callable[[int], Any],
+        interval_seconds: float = 300,
+        batch_size: int = 1000
+    ):
+        self.name = name  # what is deleted, for logs: "expired sessions"
+        self.delete_batch = delete_batch  # batch_size -> DELETE statement, rebuilt per batch
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep_once(self) -> int:
+        """Delete batch by batch. Returns the number deleted."""
+        deleted = 0
+        while True:
+            async with async_session() as session:
+                result = await session.execute(self.delete_batch(self.batch_size))
+                await session.commit()
+            deleted += result.rowcount
+            if result.rowcount < self.batch_size:
+                return deleted
+            # Short pause between batches so the sweep never monopolizes the table
+            await asyncio.sleep(0.1)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                deleted = await self.sweep_once()
+                if deleted:
+                    logger.info(f"Swept {deleted} {self.name}")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Sweep of {self.name} failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
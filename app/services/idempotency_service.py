@@ -0,0 +1,260 @@
+"""
+Idempotency Service
+Replays the stored response for retried requests that carry an Idempotency-Key.
+Expired keys are purged in batches by idempotency_sweeper.
+
+A failed request releases its key so the client can retry, unless the handler
+already committed its effects (see mark_committed): then the key is kept, and
+retries get a 409 rather than repeating the order or scan.
+"""
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update, delete, or_, null, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import get_settings
+from app.db.models import IdempotencyKey
+from app.db.session import async_session
+from app.services.batch_sweeper import BatchSweeper
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# response_json placeholders: the handler committed (response not stored yet),
+# and the handler committed but its response could never be stored
+COMMITTED = "committed"
+RESPONSE_LOST = "response_lost"
+_STATE = "_idempotency"
+
+# (user_id, key) claimed by the request running in this context
+_claimed_key_ctx: ContextVar[Optional[Tuple[UUID, str]]] = ContextVar("idempotency_claimed_key", default=None)
+
+
+def _state(response_json: Any) -> Optional[str]:
+    return response_json.get(_STATE) if isinstance(response_json, dict) else None
+
+
+class IdempotencyService:
+    """Service for storing and replaying responses keyed by (user, Idempotency-Key)"""
+
+    # Requests currently executing on this worker, so local duplicates
+    # wait on the same future instead of polling the database
+    _inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+
+    @staticmethod
+    async def run(
+        user_id: str,
+        key: Optional[str],
+        scope: str,
+        handler: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run handler once per (user, key) and return its JSON-encoded result
+
+        Args:
+            user_id: Authenticated user id
+            key: Value of the Idempotency-Key header (handler runs directly if None)
+            scope: Endpoint identifier, e.g. "POST /orders"
+            handler: Coroutine factory producing the response
+
+        Returns:
+            The stored response for this key, or the fresh handler result
+        """
+        if not key:
+            return await handler()
+        if len(key) > 255:
+            raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+        inflight_key = (user_id, key, scope)
+        pending = IdempotencyService._inflight.get(inflight_key)
+        if pending:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark exceptions as retrieved even when no duplicate is waiting
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        IdempotencyService._inflight[inflight_key] = future
+        try:
+            result = await IdempotencyService._execute(UUID(user_id), key, scope, handler)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            IdempotencyService._inflight.pop(inflight_key, None)
+
+    @staticmethod
+    async def _claim(user_id: UUID, key: str, scope: str) -> bool:
+        """Insert the key, or take over an expired/abandoned one. True if we own it."""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS)
+        stmt = insert(IdempotencyKey).values(
+            user_id=user_id,
+            key=key,
+            scope=scope,
+            created_at=now,
+            expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                "scope": stmt.excluded.scope,
+                "response_json": null(),
+                "created_at": stmt.excluded.created_at,
+                "expires_at": stmt.excluded.expires_at,
+            },
+            where=or_(
+                IdempotencyKey.expires_at < now,
+                (IdempotencyKey.response_json.is_(None)) & (IdempotencyKey.created_at < stale_before),
+            ),
+        ).returning(IdempotencyKey.key)
+
+        async with async_session() as session:
+            claimed = (await session.execute(stmt)).scalar_one_or_none()
+            await session.commit()
+        return claimed is not None
+
+    @staticmethod
+    async def _execute(
+        user_id: UUID,
+        key: str,
+        scope: str,
+        handler: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        while not await IdempotencyService._claim(user_id, key, scope):
+            stored = await IdempotencyService._wait_for_response(user_id, key, scope)
+            if stored is not None:
+                return stored
+            # The first request failed and released the key, so try to claim it again
+
+        token = _claimed_key_ctx.set((user_id, key))
+        try:
+            result = jsonable_encoder(await handler())
+        except BaseException:
+            await IdempotencyService._release(user_id, key)
+            raise
+        finally:
+            _claimed_key_ctx.reset(token)
+
+        try:
+            async with async_session() as session:
+                await session.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+                    .values(response_json=result)
+                )
+                await session.commit()
+        except BaseException:
+            # The handler's effects are committed: never let a retry repeat them
+            await IdempotencyService._release(user_id, key, completed=True)
+            raise
+        return result
+
+    @staticmethod
+    async def mark_committed(session: AsyncSession) -> None:
+        """
+        Record, in the handler's own transaction, that the request's effects are
+        about to be committed. Call it just before that commit; a failure after
+        it then keeps the key instead of releasing it. No-op without a key.
+        """
+        claimed = _claimed_key_ctx.get()
+        if claimed is None:
+            return
+        user_id, key = claimed
+        await session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.response_json.is_(None))
+            .values(response_json={_STATE: COMMITTED})
+        )
+
+    @staticmethod
+    async def _release(user_id: UUID, key: str, completed: bool = False) -> None:
+        """
+        After a failure: delete the key so the client can retry, unless the
+        handler committed (or completed) - then flag that its response is lost
+        """
+        this_key = (IdempotencyKey.user_id == user_id) & (IdempotencyKey.key == key)
+        not_committed = IdempotencyKey.response_json.is_(None)
+        try:
+            async with async_session() as session:
+                if not completed:
+                    await session.execute(delete(IdempotencyKey).where(this_key, not_committed))
+                await session.execute(
+                    update(IdempotencyKey)
+                    .where(this_key, or_(not_committed, IdempotencyKey.response_json[_STATE].as_string() == COMMITTED))
+                    .values(response_json={_STATE: RESPONSE_LOST})
+                )
+                await session.commit()
+        except Exception:
+            logger.exception(f"Failed to release idempotency key for user {user_id}")
+
+    @staticmethod
+    async def _wait_for_response(user_id: UUID, key: str, scope: str) -> Optional[Any]:
+        """
+        Poll until the request that owns the key (possibly on another worker) stores
+        its response. Returns None if the key was released without a response.
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS
+        delay = 0.1
+        while True:
+            async with async_session() as session:
+                result = await session.execute(
+                    select(IdempotencyKey.scope, IdempotencyKey.response_json).where(
+                        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+                    )
+                )
+                row = result.one_or_none()
+
+            if row is None:
+                return None
+            stored_scope, response_json = row
+            if stored_scope != scope:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if _state(response_json) == RESPONSE_LOST:
+                raise HTTPException(
+                    status_code=409,
+                    detail="The request with this Idempotency-Key completed, but its response is unavailable"
+                )
+            if response_json is not None and _state(response_json) != COMMITTED:
+                logger.info(f"Replaying stored response for {scope}")
+                return response_json
+            if time.monotonic() > deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress"
+                )
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+
+def _delete_expired_keys(batch_size: int):
+    expired = (
+        select(IdempotencyKey.user_id, IdempotencyKey.key)
+        .where(IdempotencyKey.expires_at < datetime.utcnow())
+        .limit(batch_size)
+    )
+    return delete(IdempotencyKey).where(tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(expired))
+
+
+idempotency_sweeper = BatchSweeper(
+    "expired idempotency keys",
+    _delete_expired_keys,
+    interval_seconds=settings.IDEMPOTENCY_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.IDEMPOTENCY_SWEEP_BATCH_SIZE
+)
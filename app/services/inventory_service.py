@@ -0,0 +1,102 @@
+"""
+Inventory Service
+Reserves and releases product stock with set-based conditional updates
+"""
+import logging
+from typing import Dict, List
+from uuid import UUID
+from sqlalchemy import select, update, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import ProductInventory, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStockError(Exception):
+    """Raised when one or more products don't have enough stock"""
+
+    def __init__(self, product_ids: List[UUID]):
+        self.product_ids = product_ids
+        super().__init__(f"Insufficient stock for: {', '.join(str(p) for p in product_ids)}")
+
+
+class InventoryService:
+    """Service for reserving and releasing stock"""
+
+    @staticmethod
+    async def _lock_rows(session: AsyncSession, product_ids: List[UUID]) -> None:
+        """
+        Lock inventory rows in product_id order so concurrent
+        checkouts sharing SKUs always acquire locks in the same order
+        """
+        await session.execute(
+            select(ProductInventory.product_id)
+            .where(ProductInventory.product_id.in_(product_ids))
+            .order_by(ProductInventory.product_id)
+            .with_for_update()
+        )
+
+    @staticmethod
+    async def reserve(session: AsyncSession, quantities: Dict[UUID, int]) -> None:
+        """
+        Decrement stock for every product in one conditional update
+
+        Args:
+            session: Database session (caller owns the transaction)
+            quantities: Mapping of product_id to quantity to reserve
+
+        Raises:
+            InsufficientStockError: If any product is short. Nothing is
+                committed, so the caller should let the transaction roll back.
+        """
+        if not quantities:
+            return
+
+        product_ids = sorted(quantities)
+        await InventoryService._lock_rows(session, product_ids)
+
+        requested = case(quantities, value=ProductInventory.product_id)
+        result = await session.execute(
+            update(ProductInventory)
+            .where(
+                ProductInventory.product_id.in_(product_ids),
+                ProductInventory.quantity >= requested,
+            )
+            .values(quantity=ProductInventory.quantity - requested)
+            .returning(ProductInventory.product_id)
+            .execution_options(synchronize_session=False)
+        )
+        reserved = set(result.scalars().all())
+
+        short = [product_id for product_id in product_ids if product_id not in reserved]
+        if short:
+            logger.info(f"Stock reservation failed for {len(short)} product(s)")
+            raise InsufficientStockError(short)
+
+    @staticmethod
+    async def release_order(session: AsyncSession, order_id: UUID) -> None:
+        """
+        Return the stock held by an order's items
+
+        Args:
+            session: Database session (caller owns the transaction)
+            order_id: ID of the order being cancelled
+        """
+        items_result = await session.execute(
+            select(OrderItem.product_id, OrderItem.quantity)
+            .where(OrderItem.order_id == order_id)
+        )
+        quantities = dict(items_result.all())
+        if not quantities:
+            return
+
+        product_ids = sorted(quantities)
+        await InventoryService._lock_rows(session, product_ids)
+
+        released = case(quantities, value=ProductInventory.product_id)
+        await session.execute(
+            update(ProductInventory)
+            .where(ProductInventory.product_id.in_(product_ids))
+            .values(quantity=ProductInventory.quantity + released)
+            .execution_options(synchronize_session=False)
+        )
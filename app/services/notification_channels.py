@@ -0,0 +1,49 @@
+"""
+Notification Channels
+Destinations the outbox dispatcher delivers batches of messages to
+"""
+import logging
+from typing import Dict, List, Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationChannel:
+    """Base class for a delivery channel. send_batch must raise on failure."""
+
+    name = "base"
+
+    async def send_batch(self, messages: List[Dict]) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class LoggingChannel(NotificationChannel):
+    """Local stand-in for SMS/push providers: logs each message"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def send_batch(self, messages: List[Dict]) -> None:
+        for message in messages:
+            logger.info(f"[{self.name}] {message['topic']} {message['payload']}")
+
+
+class WebhookChannel(NotificationChannel):
+    """POSTs each batch as one JSON array to a webhook URL"""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0, client: Optional[httpx.AsyncClient] = None):
+        self.url = url
+        self.client = client or httpx.AsyncClient(timeout=timeout)
+
+    async def send_batch(self, messages: List[Dict]) -> None:
+        response = await self.client.post(self.url, json=messages)
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,71 @@
+"""
+Order Event Service
+Appends order history and outbox messages inside the caller's transaction
+"""
+import json
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Order, OrderEvent, OutboxMessage
+
+ORDER_STATUS_TOPIC = "order.status_changed"
+# Postgres NOTIFY channel relaying order events to every worker's stream hub
+ORDER_EVENTS_CHANNEL = "order_events"
+
+
+class OrderEventService:
+    """Service for recording order state changes"""
+
+    @staticmethod
+    async def record(
+        session: AsyncSession,
+        order: Order,
+        event: str,
+        previous_status: Optional[str] = None
+    ) -> OutboxMessage:
+        """
+        Add an OrderEvent and a matching outbox message to the session and
+        queue a NOTIFY for live streams. All of it takes effect only when the
+        caller commits, and disappears if it rolls back.
+
+        Args:
+            session: Database session that owns the order change
+            order: Order being changed (id must already be assigned)
+            event: New status, e.g. "placed", "shipped", "cancelled"
+            previous_status: Status before the change, if any
+        """
+        occurred_at = datetime.utcnow()
+        order_event = OrderEvent(
+            id=uuid4(),
+            order_id=order.id,
+            event=event,
+            created_at=occurred_at
+        )
+        message = OutboxMessage(
+            topic=ORDER_STATUS_TOPIC,
+            user_id=order.user_id,
+            payload={
+                "event_id": str(order_event.id),
+                "order_id": str(order.id),
+                "user_id": str(order.user_id),
+                "status": event,
+                "previous_status": previous_status,
+                "occurred_at": occurred_at.isoformat(),
+            },
+            created_at=occurred_at,
+            next_attempt_at=occurred_at
+        )
+        session.add(order_event)
+        session.add(message)
+        await session.flush()
+
+        # NOTIFY is transactional: listeners only see it after commit
+        await session.execute(
+            select(func.pg_notify(
+                ORDER_EVENTS_CHANNEL,
+                json.dumps({"id": message.id, "payload": message.payload})
+            ))
+        )
+        return message
@@ -0,0 +1,164 @@
+"""
+Order Stream Hub
+Per-worker fan-out of order status events to Server-Sent Event subscribers.
+Events arrive over Postgres LISTEN/NOTIFY, so changes committed on any
+worker reach streams held open on every worker.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict, deque
+from datetime import timedelta
+from typing import Deque, Dict, List, Optional, Set
+from uuid import UUID
+import asyncpg
+from sqlalchemy import select, or_
+from app.core.config import get_settings
+from app.db.models import OutboxMessage
+from app.db.session import async_session
+from app.services.order_events import ORDER_EVENTS_CHANNEL, ORDER_STATUS_TOPIC
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SUBSCRIBER_QUEUE_SIZE = 100
+REPLAY_LIMIT = 500
+SENT_IDS_REMEMBERED = 1000
+MAX_RECONNECT_DELAY_SECONDS = 30
+
+
+class OrderStreamHub:
+    """Routes order events to the queues of the owning user's open streams"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, event: Dict) -> None:
+        """Deliver an event ({"id", "payload"}) to the owning user's streams"""
+        for queue in list(self._subscribers.get(event["payload"].get("user_id"), ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: end its stream so it reconnects and
+                # catches up from Last-Event-ID instead of buffering here
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            self.publish(json.loads(payload))
+        except (ValueError, KeyError, AttributeError):
+            logger.warning("Ignoring malformed order event notification")
+
+    async def _listen(self) -> None:
+        dsn = settings.database_url.replace("postgresql+asyncpg://", "postgresql://")
+        delay = 1
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(ORDER_EVENTS_CHANNEL, self._on_notify)
+                logger.info("Order stream hub listening for order events")
+                delay = 1
+                await closed.wait()
+                logger.warning("Order stream listener connection closed, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Order stream listener failed: {str(e)}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class SentEventIds:
+    """
+    Ids already sent on one stream. Outbox ids are assigned before commit,
+    so events can arrive out of id order and are deduplicated by id rather
+    than skipped for being lower than the last one sent.
+    """
+
+    def __init__(self, size: int = SENT_IDS_REMEMBERED):
+        self._ids: Set[int] = set()
+        self._order: Deque[int] = deque()
+        self.size = size
+
+    def add(self, event_id: int) -> bool:
+        """Remember event_id; False if it was already sent"""
+        if event_id in self._ids:
+            return False
+        self._ids.add(event_id)
+        self._order.append(event_id)
+        if len(self._order) > self.size:
+            self._ids.discard(self._order.popleft())
+        return True
+
+
+async def load_events_since(user_id: str, last_event_id: int) -> List[Dict]:
+    """
+    Read a user's order events for stream resume: everything after
+    last_event_id, plus events created up to ORDER_STREAM_REPLAY_OVERLAP_SECONDS
+    before it, which may have committed after it. Those can repeat events
+    the client already has; payload event_id identifies them.
+    """
+    async with async_session() as session:
+        last_created_at = (await session.execute(
+            select(OutboxMessage.created_at).where(OutboxMessage.id == last_event_id)
+        )).scalar_one_or_none()
+        resumes_after = OutboxMessage.id > last_event_id
+        if last_created_at is not None:
+            overlap_from = last_created_at - timedelta(seconds=settings.ORDER_STREAM_REPLAY_OVERLAP_SECONDS)
+            resumes_after = or_(
+                resumes_after,
+                (OutboxMessage.id < last_event_id) & (OutboxMessage.created_at >= overlap_from),
+            )
+        result = await session.execute(
+            select(OutboxMessage.id, OutboxMessage.payload)
+            .where(
+                OutboxMessage.user_id == UUID(user_id),
+                OutboxMessage.topic == ORDER_STATUS_TOPIC,
+                resumes_after,
+            )
+            .order_by(OutboxMessage.id)
+            .limit(REPLAY_LIMIT)
+        )
+        return [{"id": event_id, "payload": payload} for event_id, payload in result.all()]
+
+
+order_stream_hub = OrderStreamHub()
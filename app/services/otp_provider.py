@@ -0,0 +1,148 @@
+"""
+OTP Provider
+Sends and checks one-time passwords without blocking the event loop.
+TwilioVerifyProvider talks to the Twilio Verify REST API over a pooled
+async HTTP client; FakeOtpProvider keeps codes in memory for local runs,
+tests and benchmarks.
+"""
+import asyncio
+import logging
+import secrets
+from typing import Dict, List, Optional
+import httpx
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TWILIO_VERIFY_BASE_URL = "https://verify.twilio.com/v2"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class OtpError(Exception):
+    """Raised when the provider can't be reached or rejects the request"""
+
+
+class OtpProvider:
+    """Base class for OTP providers. phone is in E.164 form (+91XXXXXXXXXX)."""
+
+    name = "base"
+
+    async def send(self, phone: str) -> None:
+        raise NotImplementedError
+
+    async def verify(self, phone: str, code: str) -> bool:
+        """True if code is the pending OTP for phone"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class TwilioVerifyProvider(OtpProvider):
+    """Twilio Verify over a shared keep-alive connection pool"""
+
+    name = "twilio"
+
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        service_sid: str,
+        timeout: float = 5.0,
+        max_connections: int = 50,
+        retries: int = 2,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        self.retries = retries
+        self.client = client or httpx.AsyncClient(
+            base_url=f"{TWILIO_VERIFY_BASE_URL}/Services/{service_sid}",
+            auth=(account_sid, auth_token),
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 3.0)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def _post(self, path: str, data: Dict[str, str], retry_timeouts: bool) -> httpx.Response:
+        """
+        POST with exponential backoff. Connection failures and throttling
+        are always retried; read timeouts only when repeating the call is
+        harmless (the request may already have been processed).
+        """
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = await self.client.post(path, data=data)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                if last_attempt:
+                    raise OtpError(f"OTP provider unreachable: {e}") from e
+            except httpx.TimeoutException as e:
+                if last_attempt or not retry_timeouts:
+                    raise OtpError("OTP provider timed out") from e
+            except httpx.HTTPError as e:
+                raise OtpError(f"OTP provider request failed: {e}") from e
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+            await asyncio.sleep(0.2 * 2 ** attempt)
+
+    async def send(self, phone: str) -> None:
+        response = await self._post("/Verifications", {"To": phone, "Channel": "sms"}, retry_timeouts=True)
+        if response.status_code >= 400:
+            raise OtpError(f"OTP send failed ({response.status_code}): {response.text[:200]}")
+
+    async def verify(self, phone: str, code: str) -> bool:
+        response = await self._post("/VerificationCheck", {"To": phone, "Code": code}, retry_timeouts=False)
+        # 404: no pending verification (expired, already used or never sent)
+        if response.status_code == 404:
+            return False
+        if response.status_code >= 400:
+            raise OtpError(f"OTP check failed ({response.status_code}): {response.text[:200]}")
+        return response.json().get("status") == "approved"
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class FakeOtpProvider(OtpProvider):
+    """
+    Keeps codes in memory and never leaves the process.
+    With a fixed_code every phone gets that code; otherwise a random one,
+    readable from sent_codes.
+    """
+
+    name = "fake"
+
+    def __init__(self, fixed_code: Optional[str] = None):
+        self.fixed_code = fixed_code
+        self.sent_codes: Dict[str, str] = {}
+        self.sent: List[str] = []
+
+    async def send(self, phone: str) -> None:
+        code = self.fixed_code or f"{secrets.randbelow(10 ** 6):06d}"
+        self.sent_codes[phone] = code
+        self.sent.append(phone)
+        logger.info(f"[fake otp] code for {phone[:-4]}****")
+
+    async def verify(self, phone: str, code: str) -> bool:
+        expected = self.sent_codes.get(phone)
+        # compare_digest only takes ASCII str, so compare the UTF-8 bytes
+        if expected is None or not secrets.compare_digest(expected.encode(), code.encode()):
+            return False
+        del self.sent_codes[phone]
+        return True
+
+
+def build_otp_provider() -> OtpProvider:
+    if settings.OTP_PROVIDER == "fake":
+        return FakeOtpProvider(fixed_code=settings.OTP_FAKE_CODE)
+    return TwilioVerifyProvider(
+        account_sid=settings.TWILIO_SID,
+        auth_token=settings.TWILIO_AUTH_TOKEN,
+        service_sid=settings.TWILIO_VERIFY_SERVICE_SID,
+        timeout=settings.OTP_HTTP_TIMEOUT_SECONDS,
+        max_connections=settings.OTP_HTTP_MAX_CONNECTIONS,
+        retries=settings.OTP_HTTP_RETRIES
+    )
+
+
+otp_provider = build_otp_provider()
@@ -0,0 +1,198 @@
+"""
+Outbox Dispatcher
+Background worker that drains outbox_messages in batches and delivers them
+to notification channels with at-least-once semantics
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy import select, update, delete, func
+from app.core.config import get_settings
+from app.db.models import OutboxMessage
+from app.db.session import async_session
+from app.services.notification_channels import NotificationChannel, LoggingChannel, WebhookChannel
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+THROUGHPUT_WINDOW_SECONDS = 60
+PURGE_INTERVAL_SECONDS = 300
+PURGE_BATCH_SIZE = 1000
+
+
+class OutboxDispatcher:
+    """
+    Claims undelivered messages with FOR UPDATE SKIP LOCKED (so several workers
+    can run dispatchers side by side), sends each batch to every channel and
+    only then marks it delivered. A crash in between re-sends the batch.
+    """
+
+    def __init__(
+        self,
+        channels: List[NotificationChannel],
+        batch_size: int = 100,
+        poll_interval: float = 1.0,
+        max_backoff_seconds: int = 300,
+        retention_hours: int = 72
+    ):
+        self.channels = channels
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff_seconds = max_backoff_seconds
+        self.retention_hours = retention_hours
+
+        self.dispatched_total = 0
+        self.failed_batches = 0
+        self.last_batch_at: Optional[datetime] = None
+        self.last_delivery_lag_seconds = 0.0
+        self._recent: Deque[Tuple[float, int]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._last_purge = 0.0
+
+    async def dispatch_once(self) -> int:
+        """Deliver one batch. Returns the number of messages delivered."""
+        now = datetime.utcnow()
+        async with async_session() as session:
+            result = await session.execute(
+                select(OutboxMessage)
+                .where(OutboxMessage.dispatched_at.is_(None), OutboxMessage.next_attempt_at <= now)
+                .order_by(OutboxMessage.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.scalars().all()
+            if not rows:
+                return 0
+
+            messages = [
+                {
+                    "id": row.id,
+                    "topic": row.topic,
+                    "payload": row.payload,
+                    "created_at": row.created_at.isoformat(),
+                }
+                for row in rows
+            ]
+
+            try:
+                for channel in self.channels:
+                    await channel.send_batch(messages)
+            except Exception as e:
+                logger.error(f"Outbox batch of {len(rows)} failed: {str(e)}")
+                for row in rows:
+                    row.attempts += 1
+                    row.last_error = str(e)[:1000]
+                    backoff = min(2 ** row.attempts, self.max_backoff_seconds)
+                    row.next_attempt_at = now + timedelta(seconds=backoff)
+                await session.commit()
+                self.failed_batches += 1
+                return 0
+
+            delivered_at = datetime.utcnow()
+            await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_([row.id for row in rows]))
+                .values(dispatched_at=delivered_at)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+        self.dispatched_total += len(rows)
+        self.last_batch_at = delivered_at
+        self.last_delivery_lag_seconds = (delivered_at - min(row.created_at for row in rows)).total_seconds()
+        self._recent.append((time.monotonic(), len(rows)))
+        return len(rows)
+
+    async def purge_dispatched(self) -> int:
+        """Delete delivered messages older than the retention window, in small batches"""
+        cutoff = datetime.utcnow() - timedelta(hours=self.retention_hours)
+        purged = 0
+        while True:
+            async with async_session() as session:
+                ids = select(OutboxMessage.id).where(
+                    OutboxMessage.dispatched_at.isnot(None),
+                    OutboxMessage.dispatched_at < cutoff
+                ).limit(PURGE_BATCH_SIZE)
+                result = await session.execute(
+                    delete(OutboxMessage).where(OutboxMessage.id.in_(ids))
+                )
+                await session.commit()
+            purged += result.rowcount
+            if result.rowcount < PURGE_BATCH_SIZE:
+                return purged
+
+    async def run(self) -> None:
+        while True:
+            try:
+                delivered = await self.dispatch_once()
+                if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                    self._last_purge = time.monotonic()
+                    await self.purge_dispatched()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox dispatcher iteration failed")
+                delivered = 0
+
+            # Keep draining while there is a backlog, otherwise poll
+            if delivered < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for channel in self.channels:
+            await channel.close()
+
+    def throughput_per_second(self) -> float:
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW_SECONDS
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return sum(count for _, count in self._recent) / THROUGHPUT_WINDOW_SECONDS
+
+    async def metrics(self) -> Dict:
+        async with async_session() as session:
+            result = await session.execute(
+                select(func.count(OutboxMessage.id), func.min(OutboxMessage.created_at))
+                .where(OutboxMessage.dispatched_at.is_(None))
+            )
+            pending, oldest_pending = result.one()
+
+        return {
+            "running": self._task is not None,
+            "channels": [channel.name for channel in self.channels],
+            "dispatched_total": self.dispatched_total,
+            "failed_batches": self.failed_batches,
+            "throughput_per_second": round(self.throughput_per_second(), 3),
+            "pending": pending,
+            "lag_seconds": (datetime.utcnow() - oldest_pending).total_seconds() if oldest_pending else 0.0,
+            "last_delivery_lag_seconds": self.last_delivery_lag_seconds,
+            "last_batch_at": self.last_batch_at.isoformat() if self.last_batch_at else None,
+        }
+
+
+def build_dispatcher() -> OutboxDispatcher:
+    channels: List[NotificationChannel] = [LoggingChannel("sms"), LoggingChannel("push")]
+    if settings.ORDER_WEBHOOK_URL:
+        channels.append(WebhookChannel(settings.ORDER_WEBHOOK_URL))
+    return OutboxDispatcher(
+        channels,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        retention_hours=settings.OUTBOX_RETENTION_HOURS
+    )
+
+
+outbox_dispatcher = build_dispatcher()
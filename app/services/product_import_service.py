@@ -0,0 +1,193 @@
+"""
+Product Import Service
+Bulk-loads a distributor catalog CSV: rows are validated in Python, COPYed
+into a temporary staging table, then merged into products, product_inventory
+and product_images with set-based statements in one transaction
+"""
+import csv
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = {"sku", "name", "price"}
+IMAGE_URL_SEPARATOR = "|"
+MAX_REPORTED_ERRORS = 1000
+
+STAGING_COLUMNS = ["sku", "name", "description", "price", "stock_quantity", "is_active", "image_urls"]
+
+_TRUE = {"1", "true", "yes", "y"}
+_FALSE = {"0", "false", "no", "n"}
+
+
+class ProductImportError(Exception):
+    """Raised when the file itself can't be imported (e.g. missing columns)"""
+
+
+def _parse_row(row: Dict[str, Optional[str]]) -> Tuple:
+    """Validate one CSV row and convert it to a staging record. Raises ValueError."""
+    sku = (row.get("sku") or "").strip()
+    if not sku:
+        raise ValueError("sku is required")
+    if len(sku) > 100:
+        raise ValueError("sku is longer than 100 characters")
+
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("name is required")
+
+    try:
+        price = Decimal((row.get("price") or "").strip())
+    except InvalidOperation:
+        raise ValueError("price is not a number")
+    if not price.is_finite():
+        raise ValueError("price is not a number")
+    price = price.quantize(Decimal("0.01"))
+    if price < 0 or price >= Decimal("100000000"):
+        raise ValueError("price is out of range")
+
+    stock_raw = (row.get("stock_quantity") or "").strip()
+    try:
+        stock_quantity = int(stock_raw) if stock_raw else 0
+    except ValueError:
+        raise ValueError("stock_quantity is not an integer")
+    if stock_quantity < 0:
+        raise ValueError("stock_quantity is negative")
+
+    active_raw = (row.get("is_active") or "").strip().lower()
+    if not active_raw or active_raw in _TRUE:
+        is_active = True
+    elif active_raw in _FALSE:
+        is_active = False
+    else:
+        raise ValueError("is_active must be true or false")
+
+    # Empty image_urls keeps the product's existing images
+    urls_raw = (row.get("image_urls") or "").strip()
+    image_urls = [url.strip() for url in urls_raw.split(IMAGE_URL_SEPARATOR) if url.strip()] or None
+
+    description = (row.get("description") or "").strip() or None
+    return (sku, name, description, price, stock_quantity, is_active, image_urls)
+
+
+class ProductImportService:
+    """Service for bulk product imports"""
+
+    @staticmethod
+    def parse(lines: Iterable[str]) -> Tuple[List[Tuple], List[Dict]]:
+        """
+        Parse and validate CSV lines
+
+        Returns:
+            Tuple of (staging records, per-row errors)
+        """
+        reader = csv.DictReader(lines)
+        try:
+            missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+            if missing:
+                raise ProductImportError(f"Missing columns: {', '.join(sorted(missing))}")
+
+            records: List[Tuple] = []
+            errors: List[Dict] = []
+            seen_skus = set()
+            for row in reader:
+                try:
+                    record = _parse_row(row)
+                    if record[0] in seen_skus:
+                        raise ValueError("duplicate sku in file")
+                except ValueError as e:
+                    errors.append({"row": reader.line_num, "sku": row.get("sku"), "error": str(e)})
+                    continue
+                seen_skus.add(record[0])
+                records.append(record)
+        except csv.Error as e:
+            # NUL bytes, unterminated quotes etc. leave the rest of the file unreadable
+            raise ProductImportError(f"Malformed CSV at line {reader.line_num + 1}: {e}") from e
+        return records, errors
+
+    @staticmethod
+    async def load(session: AsyncSession, records: List[Tuple]) -> Dict[str, int]:
+        """
+        COPY records into a staging table and merge them. The caller commits.
+
+        Returns:
+            Counts of inserted and updated products
+        """
+        if not records:
+            return {"inserted": 0, "updated": 0}
+
+        await session.execute(text("""
+            CREATE TEMP TABLE product_import_staging (
+                sku varchar(100) PRIMARY KEY,
+                name text NOT NULL,
+                description text,
+                price numeric(10,2) NOT NULL,
+                stock_quantity integer NOT NULL,
+                is_active boolean NOT NULL,
+                image_urls text[]
+            ) ON COMMIT DROP
+        """))
+
+        # COPY through the session's own asyncpg connection (same transaction)
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            "product_import_staging", records=records, columns=STAGING_COLUMNS
+        )
+
+        result = await session.execute(text("""
+            INSERT INTO products (id, sku, name, description, price, is_active)
+            SELECT gen_random_uuid(), sku, name, description, price, is_active
+            FROM product_import_staging
+            ON CONFLICT (sku) DO UPDATE SET
+                name = EXCLUDED.name,
+                description = EXCLUDED.description,
+                price = EXCLUDED.price,
+                is_active = EXCLUDED.is_active
+            RETURNING (xmax = 0) AS inserted
+        """))
+        flags = result.scalars().all()
+        inserted = sum(1 for flag in flags if flag)
+
+        await session.execute(text("""
+            INSERT INTO product_inventory (product_id, quantity)
+            SELECT p.id, s.stock_quantity
+            FROM product_import_staging s
+            JOIN products p ON p.sku = s.sku
+            ON CONFLICT (product_id) DO UPDATE SET quantity = EXCLUDED.quantity
+        """))
+
+        # Rows that list images replace the product's images
+        await session.execute(text("""
+            DELETE FROM product_images pi
+            USING product_import_staging s
+            JOIN products p ON p.sku = s.sku
+            WHERE pi.product_id = p.id AND s.image_urls IS NOT NULL
+        """))
+        await session.execute(text("""
+            INSERT INTO product_images (id, product_id, image_url)
+            SELECT gen_random_uuid(), p.id, url
+            FROM product_import_staging s
+            JOIN products p ON p.sku = s.sku
+            CROSS JOIN LATERAL unnest(s.image_urls) AS url
+        """))
+
+        return {"inserted": inserted, "updated": len(flags) - inserted}
+
+    @staticmethod
+    async def import_csv(session: AsyncSession, lines: Iterable[str]) -> Dict:
+        """Parse (off the event loop), load and report. The caller commits."""
+        records, errors = await run_in_threadpool(ProductImportService.parse, lines)
+        counts = await ProductImportService.load(session, records)
+        logger.info(
+            f"Product import: {counts['inserted']} inserted, {counts['updated']} updated, {len(errors)} rejected"
+        )
+        return {
+            **counts,
+            "rejected": len(errors),
+            "errors": errors[:MAX_REPORTED_ERRORS],
+        }
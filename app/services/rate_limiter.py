@@ -0,0 +1,168 @@
+"""
+Rate Limiter
+GCRA (generic cell rate algorithm) limits: a key may make `limit` calls per
+`period_seconds`, bursting up to `limit`, then one call per period/limit.
+Each key stores a single timestamp (its theoretical arrival time), so memory
+is O(1) per active key, and a key whose timestamp has passed carries no state
+and is evicted.
+
+Backends:
+    memory   - per process; for a single worker and local runs
+    postgres - UNLOGGED rate_limits table shared by all workers
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from fastapi import HTTPException
+from sqlalchemy import text
+from app.core.config import get_settings
+from app.db.session import async_session
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class RateLimit(NamedTuple):
+    limit: int
+    period_seconds: float
+
+    @property
+    def interval(self) -> float:
+        """Seconds between calls at the sustained rate"""
+        return self.period_seconds / self.limit
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: float  # seconds until the next call would be allowed (0 if allowed)
+
+
+class RateLimiterBackend:
+    """Base class for GCRA state storage"""
+
+    name = "base"
+
+    async def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        raise NotImplementedError
+
+
+class InMemoryBackend(RateLimiterBackend):
+    """Per-process state in LRU order; idle keys are evicted as new hits arrive"""
+
+    name = "memory"
+
+    # Idle keys examined for eviction per hit; keeps eviction O(1) amortized
+    EVICT_PER_HIT = 2
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        for _ in range(self.EVICT_PER_HIT):
+            if not self._tats:
+                return
+            key, tat = next(iter(self._tats.items()))
+            if tat > now and len(self._tats) < self.max_keys:
+                return
+            del self._tats[key]
+
+    async def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        now = time.monotonic()
+        self._evict(now)
+
+        tat = max(self._tats.get(key, now), now)
+        new_tat = tat + rate.interval
+        excess = new_tat - now - rate.period_seconds
+        if excess > 0:
+            return RateLimitResult(False, excess)
+
+        self._tats[key] = new_tat
+        self._tats.move_to_end(key)
+        return RateLimitResult(True, 0.0)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class PostgresBackend(RateLimiterBackend):
+    """
+    Shared state in the UNLOGGED rate_limits table (skips WAL; contents are
+    lost on a crash, which only resets limits). Each hit is one atomic
+    upsert against the database clock, so workers agree.
+    """
+
+    name = "postgres"
+
+    _HIT = text("""
+        WITH clock AS (SELECT extract(epoch FROM clock_timestamp())::double precision AS now)
+        INSERT INTO rate_limits (key, tat)
+        SELECT :key, clock.now + :interval FROM clock
+        ON CONFLICT (key) DO UPDATE
+            SET tat = GREATEST(rate_limits.tat, EXCLUDED.tat - :interval) + :interval
+            WHERE GREATEST(rate_limits.tat, EXCLUDED.tat - :interval) - (EXCLUDED.tat - :interval) + :interval <= :period
+        RETURNING tat
+    """)
+
+    _REMAINING = text("""
+        SELECT tat - extract(epoch FROM clock_timestamp())::double precision
+        FROM rate_limits WHERE key = :key
+    """)
+
+    _PURGE = text("""
+        DELETE FROM rate_limits WHERE tat < extract(epoch FROM clock_timestamp())::double precision
+    """)
+
+    def __init__(self, purge_interval_seconds: float = 60):
+        self.purge_interval_seconds = purge_interval_seconds
+        self._last_purge = time.monotonic()
+
+    async def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        params = {"key": key, "interval": rate.interval, "period": rate.period_seconds}
+        async with async_session() as session:
+            allowed = (await session.execute(self._HIT, params)).scalar_one_or_none() is not None
+            retry_after = 0.0
+            if not allowed:
+                remaining = (await session.execute(self._REMAINING, {"key": key})).scalar_one_or_none() or 0.0
+                retry_after = max(remaining + rate.interval - rate.period_seconds, 0.0)
+
+            if time.monotonic() - self._last_purge >= self.purge_interval_seconds:
+                self._last_purge = time.monotonic()
+                await session.execute(self._PURGE)
+            await session.commit()
+        return RateLimitResult(allowed, retry_after)
+
+
+class RateLimiter:
+    """Applies named limits to keys on top of a backend"""
+
+    def __init__(self, backend: RateLimiterBackend):
+        self.backend = backend
+
+    async def hit(self, key: str, rate: RateLimit) -> RateLimitResult:
+        return await self.backend.hit(key, rate)
+
+    async def check(self, key: str, rate: RateLimit, detail: str = "Too many requests. Try later.") -> None:
+        """Count one call for key; raises 429 with Retry-After when over the limit"""
+        result = await self.backend.hit(key, rate)
+        if not result.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail=detail,
+                headers={"Retry-After": str(max(1, math.ceil(result.retry_after)))}
+            )
+
+
+def build_rate_limiter(backend_name: Optional[str] = None) -> RateLimiter:
+    backend_name = backend_name or settings.RATE_LIMIT_BACKEND
+    if backend_name == "memory":
+        return RateLimiter(InMemoryBackend(max_keys=settings.RATE_LIMIT_MEMORY_MAX_KEYS))
+    return RateLimiter(PostgresBackend())
+
+
+OTP_RATE = RateLimit(settings.OTP_RATE_LIMIT, settings.OTP_RATE_WINDOW_SECONDS)
+ANALYZE_RATE = RateLimit(settings.ANALYZE_RATE_LIMIT, settings.ANALYZE_RATE_WINDOW_SECONDS)
+
+rate_limiter = build_rate_limiter()
@@ -0,0 +1,63 @@
+"""
+Role Service
+Resolves user roles with a short-lived in-process cache.
+Roles are also embedded in access tokens at login; the cache lets
+sensitive endpoints notice revocations without a query per request.
+"""
+import logging
+from typing import List
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.db.models import UserRole
+from app.db.session import async_session
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+# user_id -> sorted roles
+role_cache = TTLCache(ttl_seconds=settings.ROLE_CACHE_TTL_SECONDS)
+
+
+class RoleService:
+    """Service for reading and granting user roles"""
+
+    @staticmethod
+    async def load_roles(session: AsyncSession, user_id) -> List[str]:
+        """Roles straight from the database; refreshes the cache"""
+        result = await session.execute(
+            select(UserRole.role).where(UserRole.user_id == UUID(str(user_id)))
+        )
+        roles = sorted({role for role in result.scalars().all() if role})
+        role_cache.set(str(user_id), roles)
+        return roles
+
+    @staticmethod
+    async def get_roles(user_id: str) -> List[str]:
+        """Cached roles; queries the database only on a miss"""
+        roles = role_cache.get(user_id)
+        if roles is None:
+            async with async_session() as session:
+                roles = await RoleService.load_roles(session, user_id)
+        return roles
+
+    @staticmethod
+    async def grant(session: AsyncSession, user_id, role: str) -> bool:
+        """
+        Give user_id a role if they don't have it. The caller commits.
+
+        Returns:
+            True if the role was added
+        """
+        result = await session.execute(
+            select(UserRole.id).where(UserRole.user_id == UUID(str(user_id)), UserRole.role == role)
+        )
+        if result.scalar_one_or_none():
+            return False
+        session.add(UserRole(user_id=UUID(str(user_id)), role=role))
+        role_cache.invalidate(str(user_id))
+        logger.info(f"Granted role {role} to user {user_id}")
+        return True
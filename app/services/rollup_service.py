@@ -0,0 +1,185 @@
+"""
+Rollup Service
+Maintains daily aggregate tables for the admin dashboard.
+Counters are bumped in the same transaction as the scan/order write;
+the backfill rebuilds a date range from the raw tables.
+
+Each day's counters are spread over ROLLUP_SHARDS rows and every write picks
+one at random, so concurrent checkouts and scans rarely wait on each other's
+row lock until commit. Readers sum over the shards.
+
+Backfill usage:
+    python -m app.services.rollup_service --since 2025-01-01 [--until 2025-02-01]
+"""
+import argparse
+import asyncio
+import logging
+import random
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import select, delete, func, cast, literal, text, Date, String
+from sqlalchemy.dialects.postgresql import insert, JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import DailyStat, DailyDiseaseCount, PlantScan, ScanResult, Order
+from app.db.session import async_session
+from app.core.logging import setup_logging
+
+logger = logging.getLogger(__name__)
+
+DISEASE_NAME_MAX_LENGTH = 200
+UNKNOWN_DISEASE = "Unknown"
+ROLLUP_SHARDS = 16
+
+
+def _shard() -> int:
+    return random.randrange(ROLLUP_SHARDS)
+
+
+def normalize_disease_sql(name):
+    """
+    SQL normalization of a disease name; the same expression as the
+    generated scan_results.disease_name column. Filters run user input
+    through it (normalize_disease_value) so they match that column exactly;
+    Python's str.title()/strip() differ from initcap()/btrim() on digits,
+    apostrophes and non-space whitespace.
+    """
+    return func.substr(func.initcap(func.btrim(name)), 1, DISEASE_NAME_MAX_LENGTH)
+
+
+def normalize_disease_value(name: str):
+    """normalize_disease_sql for a value supplied by the caller"""
+    return normalize_disease_sql(literal(name, String))
+
+
+def disease_key(result_json):
+    """
+    Rollup key for a scan result (JSONB expression): the normalized
+    disease_name, falling back to the first detection's label when there is
+    none, as the dashboard always has. NULL or "Unknown" are not counted.
+    """
+    return func.coalesce(
+        func.nullif(normalize_disease_sql(func.jsonb_extract_path_text(result_json, "disease_name")), ""),
+        func.nullif(normalize_disease_sql(func.jsonb_extract_path_text(result_json, "detections", "0", "label")), ""),
+    )
+
+
+class RollupService:
+    """Service for incrementally maintained daily rollups"""
+
+    @staticmethod
+    async def record_scan(session: AsyncSession, day: date, result_json: Optional[Dict[str, Any]]) -> None:
+        """Count one scan (and its disease, if known) for the given day"""
+        shard = _shard()
+        stmt = insert(DailyStat).values(day=day, shard=shard, scans=1, orders=0, revenue=0)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[DailyStat.day, DailyStat.shard],
+            set_={"scans": DailyStat.scans + 1}
+        ))
+
+        if isinstance(result_json, dict):
+            # Keyed in SQL, so the key matches the backfill and scan_results.disease_name
+            disease = disease_key(literal(result_json, JSONB))
+            stmt = insert(DailyDiseaseCount).from_select(
+                ["day", "disease_name", "shard", "count"],
+                select(literal(day, Date), disease, literal(shard), literal(1)).where(disease != UNKNOWN_DISEASE)
+            )
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=[DailyDiseaseCount.day, DailyDiseaseCount.disease_name, DailyDiseaseCount.shard],
+                set_={"count": DailyDiseaseCount.count + 1}
+            ))
+
+    @staticmethod
+    async def record_order(session: AsyncSession, day: date, amount: float) -> None:
+        """Count one order and its amount for the given day"""
+        stmt = insert(DailyStat).values(day=day, shard=_shard(), scans=0, orders=1, revenue=amount)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[DailyStat.day, DailyStat.shard],
+            set_={
+                "orders": DailyStat.orders + 1,
+                "revenue": DailyStat.revenue + stmt.excluded.revenue,
+            }
+        ))
+
+    @staticmethod
+    async def record_cancellation(session: AsyncSession, day: date, amount) -> None:
+        """Take a cancelled order's amount back out of the revenue of the day it was placed"""
+        stmt = insert(DailyStat).values(day=day, shard=_shard(), scans=0, orders=0, revenue=-amount)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[DailyStat.day, DailyStat.shard],
+            set_={"revenue": DailyStat.revenue + stmt.excluded.revenue}
+        ))
+
+    @staticmethod
+    async def backfill(session: AsyncSession, since: date, until: date) -> None:
+        """
+        Rebuild rollups for days in [since, until) from the raw tables with
+        set-based statements, into shard 0. Runs in the caller's transaction.
+        """
+        start = datetime.combine(since, time.min)
+        end = datetime.combine(until, time.min)
+
+        await session.execute(delete(DailyStat).where(DailyStat.day >= since, DailyStat.day < until))
+        await session.execute(
+            delete(DailyDiseaseCount).where(DailyDiseaseCount.day >= since, DailyDiseaseCount.day < until)
+        )
+
+        scan_day = cast(PlantScan.created_at, Date)
+        in_scan_range = (PlantScan.created_at >= start) & (PlantScan.created_at < end)
+        await session.execute(
+            insert(DailyStat).from_select(
+                ["day", "scans", "orders", "revenue"],
+                select(scan_day, func.count(), literal(0), literal(0))
+                .where(in_scan_range)
+                .group_by(scan_day)
+            )
+        )
+
+        order_day = cast(Order.created_at, Date)
+        stmt = insert(DailyStat).from_select(
+            ["day", "scans", "orders", "revenue"],
+            select(
+                order_day,
+                literal(0),
+                func.count(),
+                # Cancelled orders still count as orders but bring no revenue
+                func.coalesce(func.sum(Order.total_amount).filter(Order.status.is_distinct_from("cancelled")), 0)
+            )
+            .where(Order.created_at >= start, Order.created_at < end)
+            .group_by(order_day)
+        )
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[DailyStat.day, DailyStat.shard],
+            set_={"orders": stmt.excluded.orders, "revenue": stmt.excluded.revenue}
+        ))
+
+        disease = disease_key(ScanResult.result_json)
+        await session.execute(
+            insert(DailyDiseaseCount).from_select(
+                ["day", "disease_name", "count"],
+                select(scan_day, disease, func.count())
+                .join(PlantScan, ScanResult.scan_id == PlantScan.id)
+                .where(in_scan_range, disease.isnot(None), disease != "", disease != UNKNOWN_DISEASE)
+                .group_by(text("1"), text("2"))
+            )
+        )
+
+
+async def _run_backfill(since: date, until: date) -> None:
+    async with async_session() as session:
+        await RollupService.backfill(session, since, until)
+        await session.commit()
+    logger.info(f"Rollups rebuilt for {since} to {until}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild daily dashboard rollups")
+    parser.add_argument("--since", type=date.fromisoformat, required=True)
+    parser.add_argument(
+        "--until",
+        type=date.fromisoformat,
+        default=date.today() + timedelta(days=1),
+        help="exclusive end day (default: tomorrow)"
+    )
+    args = parser.parse_args()
+    setup_logging("INFO")
+    asyncio.run(_run_backfill(args.since, args.until))
@@ -0,0 +1,118 @@
+"""
+Session Store
+Refresh-token sessions. Tokens are random and only their SHA-256 digest is
+stored, so the unique index holds fixed 32-byte keys. Recent lookups are
+cached briefly per process, each user keeps at most SESSION_MAX_PER_USER
+sessions, and a background sweeper deletes expired rows in small batches.
+
+Logout clears the cache on the worker that handled it; other workers may
+honour the token until their cache entry expires (SESSION_CACHE_TTL_SECONDS).
+"""
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.db.models import UserSession
+from app.db.session import async_session
+from app.services.batch_sweeper import BatchSweeper
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# token digest -> (user_id, expires_at)
+session_cache = TTLCache(ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS)
+
+
+def hash_token(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def resolve_query(digest: bytes):
+    return select(UserSession.user_id, UserSession.expires_at).where(UserSession.token_hash == digest)
+
+
+class SessionStore:
+    """Service for creating, resolving and revoking refresh-token sessions"""
+
+    @staticmethod
+    async def create(session: AsyncSession, user_id) -> str:
+        """
+        Add a session for user_id, dropping their oldest sessions beyond the
+        cap. The caller commits.
+
+        Returns:
+            The new refresh token (only its hash is persisted)
+        """
+        user_id = UUID(str(user_id))
+        keep = max(settings.SESSION_MAX_PER_USER - 1, 0)
+        oldest = (
+            select(UserSession.id)
+            .where(UserSession.user_id == user_id)
+            .order_by(UserSession.created_at.desc())
+            .offset(keep)
+        )
+        evicted = await session.execute(
+            delete(UserSession).where(UserSession.id.in_(oldest)).returning(UserSession.token_hash)
+        )
+        # Like logout: evicted tokens stop working on this worker right away
+        for digest in evicted.scalars().all():
+            session_cache.invalidate(digest)
+
+        token = secrets.token_urlsafe(32)
+        session.add(UserSession(
+            user_id=user_id,
+            token_hash=hash_token(token),
+            expires_at=datetime.utcnow() + timedelta(days=settings.SESSION_TTL_DAYS)
+        ))
+        return token
+
+    @staticmethod
+    async def resolve(token: str) -> Optional[str]:
+        """User id of a live session for token, or None"""
+        digest = hash_token(token)
+        now = datetime.utcnow()
+
+        cached = session_cache.get(digest)
+        if cached is not None:
+            user_id, expires_at = cached
+            return user_id if expires_at > now else None
+
+        async with async_session() as session:
+            result = await session.execute(resolve_query(digest))
+            row = result.one_or_none()
+        if row is None or row.expires_at <= now:
+            return None
+
+        user_id = str(row.user_id)
+        session_cache.set(digest, (user_id, row.expires_at), (row.expires_at - now).total_seconds())
+        return user_id
+
+    @staticmethod
+    async def revoke(session: AsyncSession, token: str) -> None:
+        """Delete the session for token. The caller commits."""
+        digest = hash_token(token)
+        session_cache.invalidate(digest)
+        await session.execute(delete(UserSession).where(UserSession.token_hash == digest))
+
+
+def _delete_expired_sessions(batch_size: int):
+    expired = (
+        select(UserSession.id)
+        .where(UserSession.expires_at < datetime.utcnow())
+        .limit(batch_size)
+    )
+    return delete(UserSession).where(UserSession.id.in_(expired))
+
+
+session_sweeper = BatchSweeper(
+    "expired sessions",
+    _delete_expired_sessions,
+    interval_seconds=settings.SESSION_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.SESSION_SWEEP_BATCH_SIZE
+)